@@ -1,20 +1,45 @@
 import os
-from flask import Flask, request, jsonify, session
+from flask import Flask, request, jsonify, session, Response, g
 from flask_sqlalchemy import SQLAlchemy
 from flask_mail import Mail, Message
 from flask_cors import CORS
 from werkzeug.security import generate_password_hash, check_password_hash
-from cryptography.fernet import Fernet
+from cryptography.fernet import Fernet, InvalidToken
 import pyotp
 import base64
+import json
 from functools import wraps
 from dotenv import load_dotenv
-import requests
 import time
 import datetime
 import secrets
 import logging
+import threading
+import zlib
+import atexit
 from logging.handlers import RotatingFileHandler
+from concurrent.futures import ThreadPoolExecutor
+from collections import OrderedDict
+import numpy as np
+from kucoin_cache import SnapshotCache, CacheEntry
+from kucoin_client import KucoinClient, KucoinAPIError
+from kucoin_ratelimit import KucoinRateLimiter, INTERACTIVE, BACKGROUND
+from kucoin_stream import MarketStateStore, KucoinMarketStream
+from price_hub import PriceHub
+from singleflight import SingleFlight
+from circuit_breaker import CircuitBreaker
+from market_stats import MarketStatsEngine, METRICS
+from contract_table import ContractTableStore
+from screener import Screener, ScreenerError
+from kline_store import KlineStore, KlineIngestor, INTERVALS
+from funding_history import FundingHistory, FundingRecorder
+from serialization import Serializer, dumps_json
+from projection import parse_fields, project, ProjectionError
+from scheduler import Scheduler, Job, JobLease
+from kucoin_private import KucoinPrivateClient, KucoinSigner, ServerClock, IncompleteCredentials
+from credential_vault import CredentialVault, Credentials
+from identity_cache import IdentityCache, identity_of
+from audit_writer import AuditWriter
 
 load_dotenv('ZBot.env')
 
@@ -60,6 +85,57 @@ app.config['MAIL_USERNAME'] = os.environ.get('MAIL_USERNAME')
 app.config['MAIL_PASSWORD'] = os.environ.get('MAIL_PASSWORD')
 app.config['MAIL_DEFAULT_SENDER'] = os.environ.get('MAIL_USERNAME')
 
+# KuCoin market data cache configuration
+app.config['KUCOIN_CONTRACTS_TTL'] = float(os.environ.get('KUCOIN_CONTRACTS_TTL', '5'))
+app.config['KUCOIN_CONTRACTS_MAX_STALE'] = float(os.environ.get('KUCOIN_CONTRACTS_MAX_STALE', '300'))
+app.config['KUCOIN_FUNDING_RATE_CACHE_SIZE'] = int(os.environ.get('KUCOIN_FUNDING_RATE_CACHE_SIZE', '512'))
+app.config['KUCOIN_FUNDING_WORKERS'] = int(os.environ.get('KUCOIN_FUNDING_WORKERS', '8'))
+app.config['KUCOIN_STATS_TOP_K'] = int(os.environ.get('KUCOIN_STATS_TOP_K', '20'))
+app.config['KUCOIN_SCREENER_MAX_LIMIT'] = int(os.environ.get('KUCOIN_SCREENER_MAX_LIMIT', '500'))
+app.config['KUCOIN_POOL_SIZE'] = int(os.environ.get('KUCOIN_POOL_SIZE', '10'))
+app.config['KUCOIN_PUBLIC_RATE'] = float(os.environ.get('KUCOIN_PUBLIC_RATE', '30'))  # requests per second
+app.config['KUCOIN_PUBLIC_BURST'] = int(os.environ.get('KUCOIN_PUBLIC_BURST', '60'))
+app.config['KUCOIN_PRIVATE_RATE'] = float(os.environ.get('KUCOIN_PRIVATE_RATE', '10'))  # requests per second
+app.config['KUCOIN_PRIVATE_BURST'] = int(os.environ.get('KUCOIN_PRIVATE_BURST', '20'))
+app.config['KUCOIN_CLOCK_SYNC'] = float(os.environ.get('KUCOIN_CLOCK_SYNC', '300'))
+app.config['KUCOIN_RATE_LIMIT_WAIT'] = float(os.environ.get('KUCOIN_RATE_LIMIT_WAIT', '2'))
+app.config['KUCOIN_BREAKER_FAILURES'] = int(os.environ.get('KUCOIN_BREAKER_FAILURES', '5'))
+app.config['KUCOIN_BREAKER_RESET'] = float(os.environ.get('KUCOIN_BREAKER_RESET', '30'))
+app.config['KUCOIN_STREAM_ENABLED'] = os.environ.get('KUCOIN_STREAM_ENABLED', '1') == '1'
+app.config['KUCOIN_STREAM_MAX_AGE'] = float(os.environ.get('KUCOIN_STREAM_MAX_AGE', '10'))
+# The stream carries prices only; 24h high/low/volume/OI come from snapshots and expire separately
+app.config['KUCOIN_STREAM_SNAPSHOT_MAX_AGE'] = float(os.environ.get('KUCOIN_STREAM_SNAPSHOT_MAX_AGE', '120'))
+app.config['KUCOIN_SSE_QUEUE_SIZE'] = int(os.environ.get('KUCOIN_SSE_QUEUE_SIZE', '100'))
+app.config['KUCOIN_SSE_MAX_CLIENTS'] = int(os.environ.get('KUCOIN_SSE_MAX_CLIENTS', '500'))
+app.config['KUCOIN_SSE_MAX_SYMBOLS'] = int(os.environ.get('KUCOIN_SSE_MAX_SYMBOLS', '50'))
+app.config['KUCOIN_SSE_HEARTBEAT'] = float(os.environ.get('KUCOIN_SSE_HEARTBEAT', '15'))
+app.config['KUCOIN_KLINE_DB'] = os.environ.get('KUCOIN_KLINE_DB', os.path.join(os.path.dirname(db_path), 'klines.db'))
+app.config['KUCOIN_KLINE_ENABLED'] = os.environ.get('KUCOIN_KLINE_ENABLED', '1') == '1'
+app.config['KUCOIN_KLINE_SYMBOLS'] = [symbol for symbol in os.environ.get('KUCOIN_KLINE_SYMBOLS', 'XBTUSDTM,ETHUSDTM').split(',') if symbol]
+app.config['KUCOIN_KLINE_POLL'] = float(os.environ.get('KUCOIN_KLINE_POLL', '60'))
+app.config['KUCOIN_KLINE_BACKFILL_HOURS'] = float(os.environ.get('KUCOIN_KLINE_BACKFILL_HOURS', '24'))
+app.config['KUCOIN_KLINE_MAX_LIMIT'] = int(os.environ.get('KUCOIN_KLINE_MAX_LIMIT', '1500'))
+app.config['KUCOIN_SCHEDULER_ENABLED'] = os.environ.get('KUCOIN_SCHEDULER_ENABLED', '1') == '1'
+app.config['KUCOIN_SCHEDULER_DB'] = os.environ.get('KUCOIN_SCHEDULER_DB', app.config['KUCOIN_KLINE_DB'])
+app.config['KUCOIN_SCHEDULER_JITTER'] = float(os.environ.get('KUCOIN_SCHEDULER_JITTER', '0.1'))
+app.config['KUCOIN_REFRESH_CONTRACTS'] = float(os.environ.get('KUCOIN_REFRESH_CONTRACTS', app.config['KUCOIN_CONTRACTS_TTL']))
+app.config['KUCOIN_REFRESH_TICKER'] = float(os.environ.get('KUCOIN_REFRESH_TICKER', '5'))
+app.config['KUCOIN_FUNDING_SETTLE_DELAY'] = float(os.environ.get('KUCOIN_FUNDING_SETTLE_DELAY', '15'))
+app.config['KUCOIN_COMPRESS_MIN_BYTES'] = int(os.environ.get('KUCOIN_COMPRESS_MIN_BYTES', '1024'))
+app.config['KUCOIN_FUNDING_DB'] = os.environ.get('KUCOIN_FUNDING_DB', app.config['KUCOIN_KLINE_DB'])
+app.config['KUCOIN_FUNDING_HISTORY_PERIODS'] = int(os.environ.get('KUCOIN_FUNDING_HISTORY_PERIODS', '270'))  # 90 days of 8h periods
+app.config['CREDENTIAL_VAULT_TTL'] = float(os.environ.get('CREDENTIAL_VAULT_TTL', '300'))
+app.config['CREDENTIAL_VAULT_STAMP'] = os.environ.get('CREDENTIAL_VAULT_STAMP', os.path.join(os.path.dirname(db_path), 'credentials.stamp'))
+app.config['IDENTITY_CACHE_TTL'] = float(os.environ.get('IDENTITY_CACHE_TTL', '60'))
+app.config['IDENTITY_CACHE_SIZE'] = int(os.environ.get('IDENTITY_CACHE_SIZE', '1024'))
+app.config['ACTIVITY_LOG_ASYNC'] = os.environ.get('ACTIVITY_LOG_ASYNC', '1') == '1'
+app.config['ACTIVITY_LOG_BATCH_SIZE'] = int(os.environ.get('ACTIVITY_LOG_BATCH_SIZE', '100'))
+app.config['ACTIVITY_LOG_FLUSH_INTERVAL'] = float(os.environ.get('ACTIVITY_LOG_FLUSH_INTERVAL', '0.5'))
+app.config['ACTIVITY_LOG_QUEUE_SIZE'] = int(os.environ.get('ACTIVITY_LOG_QUEUE_SIZE', '10000'))
+app.config['ACTIVITY_LOG_MAX_PAGE'] = int(os.environ.get('ACTIVITY_LOG_MAX_PAGE', '200'))
+app.config['ACTIVITY_LOG_COUNT_CAP'] = int(os.environ.get('ACTIVITY_LOG_COUNT_CAP', '10000'))
+app.config['IDENTITY_CACHE_STAMP'] = os.environ.get('IDENTITY_CACHE_STAMP', os.path.join(os.path.dirname(db_path), 'identity.stamp'))
+
 # Debug email configuration
 print(f"[DEBUG] Email configuration:")
 print(f"[DEBUG] MAIL_USERNAME: {'✅ Set' if app.config['MAIL_USERNAME'] else '❌ Not set'}")
@@ -78,6 +154,97 @@ if not FERNET_KEY:
     print(f"[INFO] Generated FERNET_KEY: {FERNET_KEY}")
 fernet = Fernet(FERNET_KEY.encode())
 
+# JSON/MessagePack encoding and compression for market-data responses
+serializer = Serializer(compress_min_bytes=app.config['KUCOIN_COMPRESS_MIN_BYTES'])
+
+# Concurrent identical upstream reads wait on one in-flight fetch
+upstream_flight = SingleFlight()
+
+# Outbound token buckets per KuCoin endpoint group
+kucoin_limiter = KucoinRateLimiter(
+    groups={'public': (app.config['KUCOIN_PUBLIC_RATE'], app.config['KUCOIN_PUBLIC_BURST']),
+            'private': (app.config['KUCOIN_PRIVATE_RATE'], app.config['KUCOIN_PRIVATE_BURST'])},
+    endpoint_groups={'contracts_active': 'public', 'contract': 'public', 'funding_rate': 'public', 'bullet': 'public',
+                     'kline': 'public', 'timestamp': 'public', 'private': 'private'}
+)
+
+# Fail fast instead of piling workers onto a KuCoin outage
+kucoin_breaker = CircuitBreaker('kucoin', failure_threshold=app.config['KUCOIN_BREAKER_FAILURES'],
+                                reset_timeout=app.config['KUCOIN_BREAKER_RESET'])
+
+# Pooled keep-alive client shared by every /api/kucoin/* route
+kucoin = KucoinClient(pool_size=app.config['KUCOIN_POOL_SIZE'], flight=upstream_flight,
+                      limiter=kucoin_limiter, rate_limit_wait=app.config['KUCOIN_RATE_LIMIT_WAIT'],
+                      breaker=kucoin_breaker)
+
+# Shared snapshot of /api/v1/contracts/active for every KuCoin route and client
+contracts_cache = SnapshotCache('contracts_active', app.config['KUCOIN_CONTRACTS_TTL'], flight=upstream_flight,
+                                max_stale=app.config['KUCOIN_CONTRACTS_MAX_STALE'])
+
+# Per-symbol funding-rate payloads, shared the same way; LRU-bounded, and only
+# listed symbols get one
+funding_rate_caches = OrderedDict()
+funding_rate_caches_lock = threading.Lock()
+
+# Signed private calls, timestamped with KuCoin's clock
+server_clock = ServerClock(kucoin.get_server_time, sync_interval=app.config['KUCOIN_CLOCK_SYNC'])
+kucoin_private = KucoinPrivateClient(kucoin, server_clock)
+
+# Decrypted API credentials, reloaded after the TTL or when any process changes a key
+credential_vault = CredentialVault(lambda owner, service: load_credentials(owner, service),
+                                   ttl=app.config['CREDENTIAL_VAULT_TTL'],
+                                   stamp_path=app.config['CREDENTIAL_VAULT_STAMP'])
+
+# Latest per-symbol state fed by the KuCoin WebSocket ingest
+market_state = MarketStateStore()
+market_stream = KucoinMarketStream(market_state, kucoin.get_public_bullet, logger=app.logger)
+
+# Running totals and top/bottom-K rankings, updated from snapshots and the stream
+market_stats = MarketStatsEngine(k=app.config['KUCOIN_STATS_TOP_K'])
+contracts_cache.add_listener(market_stats.apply_contracts)
+market_state.add_listener(market_stats.apply_update)
+
+# Columnar NumPy view of the same contracts for vectorized screens and checks
+contract_table = ContractTableStore()
+contracts_cache.add_listener(contract_table.rebuild)
+market_state.add_listener(contract_table.patch)
+
+# Screener index over each contracts snapshot (built after the table above)
+screener = Screener(max_limit=app.config['KUCOIN_SCREENER_MAX_LIMIT'])
+contracts_cache.add_listener(lambda contracts: screener.rebuild(contract_table.table(), contracts))
+
+# 1m candle history on local disk, kept current by a background ingest job
+kline_store = KlineStore(app.config['KUCOIN_KLINE_DB'])
+kline_ingestor = KlineIngestor(kline_store, kucoin.get_klines, symbols=app.config['KUCOIN_KLINE_SYMBOLS'],
+                               poll_interval=app.config['KUCOIN_KLINE_POLL'],
+                               backfill_hours=app.config['KUCOIN_KLINE_BACKFILL_HOURS'], logger=app.logger)
+
+# Settled funding rates per interval, recorded from contracts snapshots
+funding_history = FundingHistory(app.config['KUCOIN_FUNDING_DB'], max_periods=app.config['KUCOIN_FUNDING_HISTORY_PERIODS'])
+# Fed by the exclusive 'funding' job, so only one process writes settlements
+funding_recorder = FundingRecorder(funding_history)
+
+# Proactive refreshes so the first request after a quiet period hits warm data
+scheduler = Scheduler(lease=JobLease(app.config['KUCOIN_SCHEDULER_DB']), logger=app.logger)
+
+# One shared source of SSE price events for every connected dashboard
+price_hub = PriceHub(market_state, lambda symbol, state: price_event(symbol, state),
+                     queue_size=app.config['KUCOIN_SSE_QUEUE_SIZE'],
+                     max_clients=app.config['KUCOIN_SSE_MAX_CLIENTS'])
+
+# Roles and active flags of recently seen users, so auth checks skip the users table
+identity_cache = IdentityCache(lambda user_id: load_identity(id=user_id),
+                               lambda email: load_identity(email=email),
+                               ttl=app.config['IDENTITY_CACHE_TTL'], max_entries=app.config['IDENTITY_CACHE_SIZE'],
+                               stamp_path=app.config['IDENTITY_CACHE_STAMP'])
+
+# Activity-log rows are written in batches off the request path
+audit_writer = AuditWriter(lambda events: write_activity_batch(events),
+                           batch_size=app.config['ACTIVITY_LOG_BATCH_SIZE'],
+                           flush_interval=app.config['ACTIVITY_LOG_FLUSH_INTERVAL'],
+                           max_queue=app.config['ACTIVITY_LOG_QUEUE_SIZE'], logger=app.logger)
+atexit.register(audit_writer.stop)
+
 # Models
 class User(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -106,6 +273,7 @@ class APIKey(db.Model):
     key_enc = db.Column(db.String(512), nullable=False)
     secret_enc = db.Column(db.String(512), nullable=True)
     passphrase_enc = db.Column(db.String(512), nullable=True)
+    key_preview = db.Column(db.String(16), nullable=True)  # stored at write time so listings never decrypt
     created_at = db.Column(db.DateTime, default=datetime.datetime.utcnow)
 
 class ActivityLog(db.Model):
@@ -117,6 +285,41 @@ class ActivityLog(db.Model):
     user_agent = db.Column(db.String(500), nullable=True)
     created_at = db.Column(db.DateTime, default=datetime.datetime.utcnow)
 
+    # Newest-first browsing, optionally narrowed to one user or one action prefix
+    __table_args__ = (
+        db.Index('ix_activity_log_created_at_id', 'created_at', 'id'),
+        db.Index('ix_activity_log_user_id_created_at', 'user_id', 'created_at', 'id'),
+        db.Index('ix_activity_log_action_created_at', 'action', 'created_at', 'id'),
+    )
+
+# FTS5 index over activity_log text columns, kept in sync by triggers (see migrate_schema)
+ACTIVITY_LOG_FTS_SCHEMA = [
+    """CREATE VIRTUAL TABLE IF NOT EXISTS activity_log_fts USING fts5(
+        action, details, ip_address, user_agent, content='activity_log', content_rowid='id')""",
+    """CREATE TRIGGER IF NOT EXISTS activity_log_fts_insert AFTER INSERT ON activity_log BEGIN
+        INSERT INTO activity_log_fts (rowid, action, details, ip_address, user_agent)
+        VALUES (new.id, new.action, new.details, new.ip_address, new.user_agent);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS activity_log_fts_delete AFTER DELETE ON activity_log BEGIN
+        INSERT INTO activity_log_fts (activity_log_fts, rowid, action, details, ip_address, user_agent)
+        VALUES ('delete', old.id, old.action, old.details, old.ip_address, old.user_agent);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS activity_log_fts_update AFTER UPDATE ON activity_log BEGIN
+        INSERT INTO activity_log_fts (activity_log_fts, rowid, action, details, ip_address, user_agent)
+        VALUES ('delete', old.id, old.action, old.details, old.ip_address, old.user_agent);
+        INSERT INTO activity_log_fts (rowid, action, details, ip_address, user_agent)
+        VALUES (new.id, new.action, new.details, new.ip_address, new.user_agent);
+    END"""
+]
+activity_log_fts = db.table('activity_log_fts', db.column('rowid'), db.column('rank'))
+
+# Ids follow insert order, which trails created_at by the audit writer's lag; this is
+# the floor for synchronous writes (SQLite lock waits), see activity_log_id_slack()
+ACTIVITY_LOG_ID_SLACK = datetime.timedelta(seconds=5)
+
+# Never dropped by audit_writer, even when its queue is full
+SECURITY_ACTIONS = frozenset({'LOGIN_FAILED', 'ADMIN_ACCESS_DENIED', 'SUPERADMIN_ACCESS_DENIED'})
+
 # Helpers
 def log_activity(action, details=None, user_id=None):
     """Log user activity to database and file"""
@@ -129,16 +332,19 @@ def log_activity(action, details=None, user_id=None):
         ip_address = request.remote_addr
         user_agent = request.headers.get('User-Agent', '')
         
-        # Create log entry
-        log_entry = ActivityLog(
-            user_id=user_id,
-            action=action,
-            details=details,
-            ip_address=ip_address,
-            user_agent=user_agent
-        )
-        db.session.add(log_entry)
-        db.session.commit()
+        # Stamp the time now; the row itself is written later by audit_writer
+        event = {
+            'user_id': user_id,
+            'action': action,
+            'details': details,
+            'ip_address': ip_address,
+            'user_agent': user_agent,
+            'created_at': datetime.datetime.utcnow()
+        }
+        if app.config['ACTIVITY_LOG_ASYNC']:
+            audit_writer.submit(event, critical=action in SECURITY_ACTIONS)
+        else:
+            write_activity_batch([event])
         
         # Also log to file
         app.logger.info(f"Activity: {action} - User: {user_id} - Details: {details} - IP: {ip_address}")
@@ -146,19 +352,44 @@ def log_activity(action, details=None, user_id=None):
     except Exception as e:
         app.logger.error(f"Failed to log activity: {e}")
 
+def load_identity(**filters):
+    """Query one user as an Identity (the IdentityCache loader)"""
+    user = User.query.filter_by(**filters).first()
+    return identity_of(user) if user else None
+
+def current_identity():
+    """The session user's Identity, resolved at most once per request"""
+    if 'identity' not in g:
+        g.identity = identity_cache.get(session.get('user_id'))
+    return g.identity
+
+def get_superadmin():
+    return identity_cache.get_by_email(SUPERADMIN_EMAIL)
+
+def write_activity_batch(events):
+    """Insert activity-log events with one multi-row INSERT and one commit"""
+    with app.app_context():
+        db.session.execute(db.insert(ActivityLog), events)
+        db.session.commit()
+
 def login_required(f):
     @wraps(f)
     def decorated(*args, **kwargs):
         if 'user_id' not in session:
             log_activity('LOGIN_FAILED', 'No session found')
             return jsonify({'error': 'Authentication required'}), 401
+        user = current_identity()
+        if not user or not user.is_active:
+            log_activity('LOGIN_FAILED', f'Session user {session.get("user_id")} is deleted or inactive')
+            session.clear()
+            return jsonify({'error': 'Authentication required'}), 401
         return f(*args, **kwargs)
     return decorated
 
 def admin_required(f):
     @wraps(f)
     def decorated(*args, **kwargs):
-        user = User.query.get(session.get('user_id'))
+        user = current_identity()
         if not user or not (user.is_admin or user.is_superadmin):
             log_activity('ADMIN_ACCESS_DENIED', f'User {session.get("user_id")} attempted admin access')
             return jsonify({'error': 'Admin required'}), 403
@@ -168,7 +399,7 @@ def admin_required(f):
 def superadmin_required(f):
     @wraps(f)
     def decorated(*args, **kwargs):
-        user = User.query.get(session.get('user_id'))
+        user = current_identity()
         if not user or not user.is_superadmin:
             log_activity('SUPERADMIN_ACCESS_DENIED', f'User {session.get("user_id")} attempted superadmin access')
             return jsonify({'error': 'SuperAdmin required'}), 403
@@ -185,6 +416,117 @@ def decrypt(token):
         return None
     return fernet.decrypt(token.encode()).decode()
 
+def key_preview(key):
+    return key[:8] + '...' if key else None
+
+def load_credentials(owner, service):
+    """Query and decrypt one stored API key (the CredentialVault loader)"""
+    api_key = APIKey.query.filter_by(user_id=owner, name=service).first()
+    if not api_key:
+        return None
+    return Credentials(decrypt(api_key.key_enc), decrypt(api_key.secret_enc), decrypt(api_key.passphrase_enc))
+
+def migrate_schema():
+    """Add columns introduced after a database was created (create_all only creates missing tables)"""
+    columns = {row[1] for row in db.session.execute(db.text('PRAGMA table_info(api_key)'))}
+    if 'key_preview' not in columns:
+        db.session.execute(db.text('ALTER TABLE api_key ADD COLUMN key_preview VARCHAR(16)'))
+        db.session.commit()
+        app.logger.info('Migrated api_key: added key_preview')
+    # Decrypt each key once here rather than on every listing. Runs every start, so
+    # keys that could not be decrypted (wrong FERNET_KEY) are filled in once it is right
+    backfilled = 0
+    for api_key in APIKey.query.filter(APIKey.key_preview.is_(None)).all():
+        try:
+            api_key.key_preview = key_preview(decrypt(api_key.key_enc))
+            backfilled += 1
+        except InvalidToken:
+            app.logger.warning(f'Cannot decrypt API key {api_key.id} with this FERNET_KEY; its preview stays empty')
+    if backfilled:
+        db.session.commit()
+        app.logger.info(f'Backfilled key_preview for {backfilled} API keys')
+    # create_all() skips indexes of tables that already exist
+    for index in ActivityLog.__table__.indexes:
+        index.create(db.engine, checkfirst=True)
+    try:
+        fts_exists = db.session.execute(db.text(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'activity_log_fts'")).first()
+        for statement in ACTIVITY_LOG_FTS_SCHEMA:
+            db.session.execute(db.text(statement))
+        if not fts_exists:
+            # Index the rows written before the triggers existed
+            db.session.execute(db.text("INSERT INTO activity_log_fts (activity_log_fts) VALUES ('rebuild')"))
+            app.logger.info('Migrated activity_log: built full-text index')
+        db.session.commit()
+    except db.exc.OperationalError as e:
+        db.session.rollback()
+        app.logger.warning(f'Activity log search disabled, SQLite lacks FTS5: {e}')
+
+def init_schema():
+    """Create missing tables and apply migrate_schema(); idempotent"""
+    with app.app_context():
+        db.create_all()
+        try:
+            migrate_schema()
+        except Exception as e:
+            # A failed migration must not keep the server (or a maintenance script) from starting
+            db.session.rollback()
+            app.logger.error(f'Schema migration failed: {e}')
+
+# On import, so scripts and WSGI servers that import app get the same schema as app.py
+init_schema()
+
+def encode_log_cursor(log):
+    """Opaque keyset cursor pointing just past log in newest-first order"""
+    return base64.urlsafe_b64encode(f'{log.created_at.isoformat()}|{log.id}'.encode()).decode()
+
+def decode_log_cursor(cursor):
+    """Return (created_at, id) from encode_log_cursor, or raise ValueError"""
+    created_at, log_id = base64.urlsafe_b64decode(cursor.encode()).decode().rsplit('|', 1)
+    return datetime.datetime.fromisoformat(created_at), int(log_id)
+
+def activity_search_query(text):
+    """Turn free text into an FTS5 query: every word must match, as a quoted prefix"""
+    terms = text.split()[:16]
+    if not terms:
+        raise ValueError('Empty search')
+    # Quoting keeps e-mails, IPs and FTS5 operators literal; "a.b@c"* matches a b c as a phrase
+    return ' '.join('"' + term.replace('"', '""') + '"*' for term in terms)
+
+def parse_log_time(value):
+    """Parse an ISO 8601 since/until parameter into naive UTC, or None"""
+    if not value:
+        return None
+    parsed = datetime.datetime.fromisoformat(value.replace('Z', '+00:00'))
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(datetime.timezone.utc).replace(tzinfo=None)
+    return parsed
+
+def activity_log_id_slack():
+    """How far an insert may trail its created_at: the floor plus the writer's worst measured lag"""
+    return ACTIVITY_LOG_ID_SLACK + datetime.timedelta(seconds=audit_writer.max_lag())
+
+def activity_log_id_bounds(since, until):
+    """Id range that contains every row of [since, until], read from the created_at index
+
+    A row is inserted at most activity_log_id_slack() after its created_at, so a
+    row stamped before since - slack was inserted (has a lower id) before any row
+    in range, and one stamped after until + slack was inserted after all of them.
+    """
+    low = high = None
+    slack = activity_log_id_slack()
+    if since:
+        row = db.session.query(ActivityLog.id).filter(ActivityLog.created_at < since - slack) \
+            .order_by(ActivityLog.created_at.desc(), ActivityLog.id.desc()).first()
+        if row is not None:
+            low = row[0] + 1
+    if until:
+        row = db.session.query(ActivityLog.id).filter(ActivityLog.created_at > until + slack) \
+            .order_by(ActivityLog.created_at, ActivityLog.id).first()
+        if row is not None:
+            high = row[0] - 1
+    return low, high
+
 def generate_verification_code():
     return ''.join(secrets.choice('0123456789') for _ in range(6))
 
@@ -245,6 +587,155 @@ def verify_code(email, code, purpose):
     db.session.commit()
     return True
 
+def get_kucoin_signer(user_id):
+    """Return a KucoinSigner for the user's KuCoin key, or None; raises IncompleteCredentials"""
+    return credential_vault.get_derived(user_id, 'KuCoin', lambda credentials: KucoinSigner(*credentials))
+
+def private_error(e, what):
+    """Map a failed private KuCoin call to a response; key rejections are not our session's 401"""
+    if e.status in (401, 403):
+        return jsonify({'error': 'KuCoin rejected the API key', 'kucoin_status': e.status, 'kucoin_body': e.body}), 502
+    return jsonify({'error': f'Failed to fetch {what} from KuCoin', 'status': e.status}), e.status
+
+def get_active_contracts():
+    """Return the shared /contracts/active snapshot as a CacheEntry (value, age, stale)"""
+    return contracts_cache.get_entry(kucoin.get_active_contracts)
+
+def get_funding_rate(symbol, priority=INTERACTIVE):
+    """Return the shared /funding-rate payload for symbol as a CacheEntry"""
+    with funding_rate_caches_lock:
+        cache = funding_rate_caches.get(symbol)
+        if cache is None:
+            cache = funding_rate_caches[symbol] = SnapshotCache(f'funding_rate:{symbol}', app.config['KUCOIN_CONTRACTS_TTL'],
+                                                                 flight=upstream_flight)
+            while len(funding_rate_caches) > app.config['KUCOIN_FUNDING_RATE_CACHE_SIZE']:
+                funding_rate_caches.popitem(last=False)
+        else:
+            funding_rate_caches.move_to_end(symbol)
+    return cache.get_entry(lambda: (kucoin.get_funding_rate(symbol, priority), 0))
+
+def mark_age(response, entry):
+    """Tag a response built from cached data with its age, flagging it when stale"""
+    response.headers['Age'] = str(int(entry.age))
+    if entry.stale:
+        response.headers['X-Data-Stale'] = 'true'
+    return response
+
+def not_modified(etag, negotiated=True):
+    """Return a 304 if the client already holds etag, so unchanged data is never re-serialized"""
+    if etag and request.if_none_match.contains_weak(representation_etag(etag, negotiated)):
+        return tag_etag(Response(status=304), etag, negotiated)
+    return None
+
+def tag_etag(response, etag, negotiated=True):
+    """Attach etag and ask clients to revalidate before reusing their copy"""
+    response.set_etag(representation_etag(etag, negotiated))
+    response.headers['Cache-Control'] = 'private, no-cache'
+    if negotiated:
+        # Also on the 304, so caches key the revalidated body by the same headers
+        response.vary.update(('Accept', 'Accept-Encoding'))
+    return response
+
+def representation_etag(etag, negotiated=True):
+    """JSON, msgpack and each compression are different bytes, so each gets its own ETag"""
+    return f'{etag}-{serializer.variant()}' if negotiated else etag
+
+def price_payload(symbol, contract_data, include_raw=True):
+    """Map a contract payload to the /api/kucoin/price response"""
+    payload = {
+        'symbol': symbol,
+        'price': contract_data.get('lastTradePrice'),
+        'mark_price': contract_data.get('markPrice'),
+        'index_price': contract_data.get('indexPrice'),
+        'high_24h': contract_data.get('highPrice'),
+        'low_24h': contract_data.get('lowPrice'),
+        'volume_24h': contract_data.get('volumeOf24h'),
+        'turnover_24h': contract_data.get('turnoverOf24h'),
+        'open_interest': contract_data.get('openInterest'),
+        'price_change_24h': contract_data.get('priceChg'),
+        'price_change_pct_24h': contract_data.get('priceChgPct'),
+        'funding_rate': contract_data.get('fundingFeeRate'),
+        'max_leverage': contract_data.get('maxLeverage'),
+        'status': contract_data.get('status'),
+        'timestamp': contract_data.get('timestamp', None)
+    }
+    if include_raw:
+        payload['raw'] = contract_data
+    return payload
+
+def price_event(symbol, contract_data):
+    """Encode one SSE price event body (without the raw contract)"""
+    return dumps_json(price_payload(symbol, contract_data, include_raw=False)).decode('utf-8')
+
+def refresh_contracts():
+    """Reload the contracts snapshot from the public endpoint (no user credentials needed)"""
+    contracts_cache.refresh(lambda: kucoin.get_active_contracts(priority=BACKGROUND))
+
+def refresh_ticker_state():
+    """Keep watched symbols' state current from the snapshot; while streaming, only the 24h statistics"""
+    contracts = contracts_cache.peek() or []
+    watched = set(market_state.symbols())
+    connected = market_stream.connected
+    for contract in contracts:
+        if contract.get('symbol') in watched:
+            if connected:
+                market_state.merge_snapshot(contract['symbol'], contract)
+            else:
+                market_state.seed(contract['symbol'], contract)
+
+def streamed_state(symbol):
+    """Streamed state for symbol if both its prices and its 24h statistics are fresh enough, else None"""
+    if not market_stream.connected:
+        return None
+    contract_data = market_state.get(symbol, max_age=app.config['KUCOIN_STREAM_MAX_AGE'],
+                                     snapshot_max_age=app.config['KUCOIN_STREAM_SNAPSHOT_MAX_AGE'])
+    if contract_data and contract_data.get('lastTradePrice') is not None:
+        return contract_data
+    return None
+
+def seconds_until_funding():
+    """Delay until just after the next funding settlement in the snapshot, or None if unknown"""
+    contracts = contracts_cache.peek()
+    age = contracts_cache.age()
+    pending = [contract.get('nextFundingRateTime') for contract in contracts or []]
+    pending = [until for until in pending if until is not None]
+    if not pending or age is None:
+        return None
+    return max(0.0, min(pending) / 1000 - age) + app.config['KUCOIN_FUNDING_SETTLE_DELAY']
+
+def record_funding():
+    """Feed a current contracts snapshot to the funding recorder"""
+    funding_recorder.record(contracts_cache.get(lambda: kucoin.get_active_contracts(priority=BACKGROUND)))
+
+def next_funding_record():
+    """Every minute, so the recorder sees each interval's final rate, and just after each settlement"""
+    return min(60.0, seconds_until_funding() or 60.0)
+
+def register_jobs():
+    """Register the background refresh jobs with the scheduler"""
+    jitter = app.config['KUCOIN_SCHEDULER_JITTER']
+    # Cache warming fills this process's memory, so every process runs it
+    scheduler.add(Job('contracts', refresh_contracts, interval=app.config['KUCOIN_REFRESH_CONTRACTS'],
+                      jitter=jitter, exclusive=False))
+    scheduler.add(Job('clock', server_clock.sync, interval=app.config['KUCOIN_CLOCK_SYNC'],
+                      jitter=jitter, exclusive=False))
+    scheduler.add(Job('ticker', refresh_ticker_state, interval=app.config['KUCOIN_REFRESH_TICKER'],
+                      jitter=jitter, exclusive=False))
+    # Exclusive: one process records settled funding rates for everyone
+    scheduler.add(Job('funding', record_funding, interval=60, schedule=next_funding_record, jitter=jitter))
+    if app.config['KUCOIN_KLINE_ENABLED']:
+        scheduler.add(Job('klines', kline_ingestor.run_once, interval=app.config['KUCOIN_KLINE_POLL'], jitter=jitter))
+
+def start_background_services():
+    """Start long-running ingest threads (once per serving process)"""
+    if app.config['KUCOIN_STREAM_ENABLED']:
+        market_stream.start()
+    if app.config['KUCOIN_SCHEDULER_ENABLED']:
+        register_jobs()
+        scheduler.start()
+    elif app.config['KUCOIN_KLINE_ENABLED']:
+        kline_ingestor.start()
+
 # Routes
 @app.route('/api/register', methods=['POST'])
 def register():
@@ -331,7 +822,7 @@ def get_session():
         print(f"[DEBUG] No user_id in session")
         return jsonify({'error': 'Not authenticated'}), 401
     
-    user = User.query.get(session['user_id'])
+    user = current_identity()
     if not user:
         print(f"[DEBUG] User not found in database for ID: {session['user_id']}")
         return jsonify({'error': 'User not found'}), 404
@@ -351,7 +842,7 @@ def get_session():
 @login_required
 def logout():
     user_id = session.get('user_id')
-    user = User.query.get(user_id) if user_id else None
+    user = current_identity()
     user_email = user.email if user else 'Unknown'
     
     session.clear()
@@ -369,7 +860,7 @@ def logout():
 @login_required
 @superadmin_required
 def request_password_change():
-    user = User.query.get(session['user_id'])
+    user = current_identity()
     code = create_verification_code(user.email, 'password_reset')
     
     # Log password change request
@@ -397,6 +888,7 @@ def change_password():
     
     user.password_hash = generate_password_hash(new_password)
     db.session.commit()
+    identity_cache.invalidate(user.id)
     
     # Log successful password change
     log_activity('PASSWORD_CHANGED', f'Password changed successfully for: {user.email}', user.id)
@@ -408,7 +900,7 @@ def change_password():
 @login_required
 @superadmin_required
 def test_request_password_change():
-    user = User.query.get(session['user_id'])
+    user = current_identity()
     code = create_verification_code(user.email, 'password_reset')
     
     # Return the code directly for testing (don't send email)
@@ -433,6 +925,7 @@ def test_change_password():
     
     user.password_hash = generate_password_hash(new_password)
     db.session.commit()
+    identity_cache.invalidate(user.id)
     
     return jsonify({'message': 'Password changed successfully'})
 
@@ -441,7 +934,7 @@ def test_change_password():
 @login_required
 @superadmin_required
 def test_get_verification_code():
-    user = User.query.get(session['user_id'])
+    user = current_identity()
     
     # Get the most recent unused verification code for this user
     verification_code = VerificationCode.query.filter_by(
@@ -521,6 +1014,7 @@ def confirm_admin():
     
     admin.is_active = True
     db.session.commit()
+    identity_cache.invalidate(admin.id)
     
     # Log admin confirmation
     log_activity('ADMIN_CONFIRMED', f'Admin confirmed: {admin_email} ({admin.name})', session.get('user_id'))
@@ -555,9 +1049,11 @@ def delete_admin():
     
     admin_email = admin.email
     admin_name = admin.name
+    admin_id = admin.id
     
     db.session.delete(admin)
     db.session.commit()
+    identity_cache.invalidate(admin_id)
     
     # Log admin deletion
     log_activity('ADMIN_DELETED', f'Admin deleted: {admin_email} ({admin_name})', session.get('user_id'))
@@ -589,55 +1085,150 @@ def get_activity_logs():
     log_activity('ACTIVITY_LOGS_REQUESTED', 'Activity logs requested', session.get('user_id'))
     
     # Get query parameters for filtering
-    page = request.args.get('page', 1, type=int)
-    per_page = request.args.get('per_page', 50, type=int)
+    per_page = min(max(request.args.get('per_page', 50, type=int), 1), app.config['ACTIVITY_LOG_MAX_PAGE'])
+    cursor = request.args.get('cursor')
+    page = request.args.get('page', type=int)
     action_filter = request.args.get('action', '')
     user_filter = request.args.get('user_id', '', type=int)
+    search = request.args.get('q', '').strip()
+    total_mode = request.args.get('total', 'approx')
+    if total_mode not in ('approx', 'exact', 'none'):
+        return jsonify({'error': 'total must be approx, exact or none'}), 400
+    # Search results come best match first unless order=recent
+    ranked = bool(search) and request.args.get('order', 'rank') != 'recent'
+    if ranked and cursor:
+        return jsonify({'error': 'cursor requires order=recent; ranked results use page'}), 400
+    try:
+        since = parse_log_time(request.args.get('since'))
+        until = parse_log_time(request.args.get('until'))
+    except ValueError:
+        return jsonify({'error': 'since and until must be ISO 8601 times'}), 400
     
-    # Build query
-    query = ActivityLog.query
+    # Build query: users come from the same statement instead of one lookup per row
+    columns = [ActivityLog, User.email, User.name]
+    joins = []
+    filters = []
     
     if action_filter:
-        query = query.filter(ActivityLog.action.contains(action_filter))
+        # Prefix match as a range, so ix_activity_log_action_created_at can still seek to it
+        filters.append(ActivityLog.action >= action_filter)
+        filters.append(ActivityLog.action < action_filter + '\U0010FFFF')
     
     if user_filter:
-        query = query.filter(ActivityLog.user_id == user_filter)
-    
-    # Order by most recent first
-    query = query.order_by(ActivityLog.created_at.desc())
+        filters.append(ActivityLog.user_id == user_filter)
+    
+    if since:
+        filters.append(ActivityLog.created_at >= since)
+    if until:
+        filters.append(ActivityLog.created_at <= until)
+    
+    if search:
+        try:
+            match = activity_search_query(search)
+        except ValueError:
+            return jsonify({'error': 'q must contain a search term'}), 400
+        joins.append((activity_log_fts, activity_log_fts.c.rowid == ActivityLog.id))
+        filters.append(db.literal_column('activity_log_fts').op('MATCH')(match))
+        columns += [activity_log_fts.c.rank,
+                    db.func.snippet(db.literal_column('activity_log_fts'), 1, '[', ']', '...', 12)]
+        if since or until:
+            # Time-range prefilter: bound the FTS scan by rowid before any text matching
+            low, high = activity_log_id_bounds(since, until)
+            if low is not None:
+                filters.append(activity_log_fts.c.rowid >= low)
+            if high is not None:
+                filters.append(activity_log_fts.c.rowid <= high)
+    
+    query = db.session.query(*columns)
+    for target, condition in joins:
+        query = query.join(target, condition)
+    query = query.outerjoin(User, User.id == ActivityLog.user_id).filter(*filters)
+    
+    if cursor:
+        try:
+            created_at, log_id = decode_log_cursor(cursor)
+        except (ValueError, UnicodeDecodeError):
+            return jsonify({'error': 'Invalid cursor'}), 400
+        query = query.filter(db.tuple_(ActivityLog.created_at, ActivityLog.id) < (created_at, log_id))
+    
+    if ranked:
+        # FTS5's rank column is bm25(); lower is better
+        query = query.order_by(activity_log_fts.c.rank, ActivityLog.id.desc())
+    else:
+        # Order by most recent first; id breaks ties so every row has a unique position
+        query = query.order_by(ActivityLog.created_at.desc(), ActivityLog.id.desc())
+    if ranked or (page and not cursor):
+        # Offset paging for ranked results and legacy clients; cursors stay fast at any depth
+        query = query.offset((max(page or 1, 1) - 1) * per_page)
     
-    # Paginate results
-    pagination = query.paginate(
-        page=page, 
-        per_page=per_page, 
-        error_out=False
-    )
+    try:
+        rows = query.limit(per_page + 1).all()
+    except db.exc.OperationalError as e:
+        if not search:
+            raise
+        app.logger.error(f"Activity log search failed: {e}")
+        return jsonify({'error': 'Activity log search is unavailable'}), 503
+    has_next = len(rows) > per_page
+    rows = rows[:per_page]
     
     logs = []
-    for log in pagination.items:
-        user = User.query.get(log.user_id) if log.user_id else None
-        logs.append({
+    for row in rows:
+        log, user_email, user_name = row[:3]
+        entry = {
             'id': log.id,
             'action': log.action,
             'details': log.details,
             'ip_address': log.ip_address,
             'user_agent': log.user_agent,
             'created_at': log.created_at.isoformat(),
-            'user_email': user.email if user else 'Unknown',
-            'user_name': user.name if user else 'Unknown'
-        })
-    
-    return jsonify({
-        'logs': logs,
-        'pagination': {
-            'page': page,
-            'per_page': per_page,
-            'total': pagination.total,
-            'pages': pagination.pages,
-            'has_next': pagination.has_next,
-            'has_prev': pagination.has_prev
+            'user_email': user_email or 'Unknown',
+            'user_name': user_name or 'Unknown'
         }
-    })
+        if search:
+            entry['rank'] = row[3]
+            entry['snippet'] = row[4]
+        logs.append(entry)
+    
+    offset_paged = ranked or (page and not cursor)
+    total, total_exact = count_activity_logs(joins, filters, total_mode, offset_paged)
+    pagination = {
+        'per_page': per_page,
+        'has_next': has_next,
+        'next_cursor': encode_log_cursor(rows[-1][0]) if has_next and not ranked else None,
+        'total': total,
+        'total_exact': total_exact
+    }
+    if offset_paged:
+        page = max(page or 1, 1)
+        pagination.update({
+            'page': page,
+            'pages': -(-total // per_page) if total is not None else None,
+            'has_prev': page > 1
+        })
+    return jsonify({'logs': logs, 'pagination': pagination})
+
+def count_activity_logs(joins, filters, mode, offset_paged=False):
+    """Return (total, is_exact) for the filtered logs; approx never scans more than a bounded range
+
+    Offset-paged clients derive their page count from the total, so they get a
+    capped count rather than the id-span estimate.
+    """
+    if mode == 'none':
+        return None, False
+    query = db.session.query(ActivityLog.id)
+    for target, condition in joins:
+        query = query.join(target, condition)
+    query = query.filter(*filters)
+    if mode == 'exact':
+        return query.count(), True
+    if not filters and not offset_paged:
+        # Ids are assigned in insert order, so the id span approximates the row count
+        low, high = db.session.query(db.func.min(ActivityLog.id), db.func.max(ActivityLog.id)).one()
+        return (high - low + 1 if high is not None else 0), False
+    cap = app.config['ACTIVITY_LOG_COUNT_CAP']
+    capped = query.limit(cap + 1).subquery()
+    count = db.session.query(db.func.count()).select_from(capped).scalar()
+    return min(count, cap), count <= cap
 
 # Admin Password Reset
 @app.route('/api/auth/request-reset-code', methods=['POST'])
@@ -681,6 +1272,7 @@ def verify_reset_code():
     
     user.password_hash = generate_password_hash(new_password)
     db.session.commit()
+    identity_cache.invalidate(user.id)
     
     # Log successful reset
     log_activity('ADMIN_RESET_SUCCESS', f'Password reset successful for admin: {email}')
@@ -730,10 +1322,10 @@ def verify_2fa():
 def get_apikeys():
     """Get all API keys - All admins can view"""
     try:
-        user = User.query.get(session['user_id'])
+        user = current_identity()
         
         # Get all API keys from SuperAdmin user
-        superadmin = User.query.filter_by(email=SUPERADMIN_EMAIL).first()
+        superadmin = get_superadmin()
         if not superadmin:
             return jsonify({'error': 'SuperAdmin not found'}), 404
             
@@ -744,7 +1336,7 @@ def get_apikeys():
             keys_data.append({
                 'id': key.id,
                 'name': key.name,
-                'key': decrypt(key.key_enc)[:8] + '...' if key.key_enc else None,
+                'key': key.key_preview,
                 'has_secret': bool(key.secret_enc),
                 'has_passphrase': bool(key.passphrase_enc),
                 'created_at': key.created_at.isoformat() if key.created_at else None,
@@ -773,7 +1365,7 @@ def add_apikey():
             return jsonify({'error': 'Name and API key are required'}), 400
         
         # Always use SuperAdmin user for API keys
-        superadmin = User.query.filter_by(email=SUPERADMIN_EMAIL).first()
+        superadmin = get_superadmin()
         if not superadmin:
             return jsonify({'error': 'SuperAdmin not found'}), 404
         
@@ -788,11 +1380,14 @@ def add_apikey():
             name=name,
             key_enc=encrypt(key),
             secret_enc=encrypt(secret) if secret else None,
-            passphrase_enc=encrypt(passphrase) if passphrase else None
+            passphrase_enc=encrypt(passphrase) if passphrase else None,
+            key_preview=key_preview(key)
         )
         
         db.session.add(new_key)
         db.session.commit()
+        # Drops a cached "no such key" for this name
+        credential_vault.invalidate(superadmin.id, name)
         
         log_activity('API_KEY_ADDED', f'Added API key: {name}')
         return jsonify({'message': 'API key added successfully', 'id': new_key.id}), 201
@@ -808,7 +1403,7 @@ def delete_apikey(key_id):
     """Delete API key - SuperAdmin only"""
     try:
         # Always use SuperAdmin user for API keys
-        superadmin = User.query.filter_by(email=SUPERADMIN_EMAIL).first()
+        superadmin = get_superadmin()
         if not superadmin:
             return jsonify({'error': 'SuperAdmin not found'}), 404
             
@@ -820,6 +1415,7 @@ def delete_apikey(key_id):
         key_name = api_key.name
         db.session.delete(api_key)
         db.session.commit()
+        credential_vault.invalidate(superadmin.id, key_name)
         
         log_activity('API_KEY_DELETED', f'Deleted API key: {key_name}')
         return jsonify({'message': 'API key deleted successfully'})
@@ -841,7 +1437,7 @@ def update_apikey(key_id):
         passphrase = data.get('passphrase')
         
         # Always use SuperAdmin user for API keys
-        superadmin = User.query.filter_by(email=SUPERADMIN_EMAIL).first()
+        superadmin = get_superadmin()
         if not superadmin:
             return jsonify({'error': 'SuperAdmin not found'}), 404
             
@@ -861,12 +1457,15 @@ def update_apikey(key_id):
             api_key.name = name
         if key:
             api_key.key_enc = encrypt(key)
+            api_key.key_preview = key_preview(key)
         if secret is not None:  # Allow empty string to clear secret
             api_key.secret_enc = encrypt(secret) if secret else None
         if passphrase is not None:  # Allow empty string to clear passphrase
             api_key.passphrase_enc = encrypt(passphrase) if passphrase else None
         
         db.session.commit()
+        # A rename affects two names, so drop all of this owner's entries
+        credential_vault.invalidate(superadmin.id)
         
         log_activity('API_KEY_UPDATED', f'Updated API key: {api_key.name}')
         return jsonify({'message': 'API key updated successfully'})
@@ -882,7 +1481,7 @@ def decrypt_apikey(key_id):
     """Get decrypted API key data - SuperAdmin only"""
     try:
         # Always use SuperAdmin user for API keys
-        superadmin = User.query.filter_by(email=SUPERADMIN_EMAIL).first()
+        superadmin = get_superadmin()
         if not superadmin:
             return jsonify({'error': 'SuperAdmin not found'}), 404
             
@@ -912,26 +1511,26 @@ def get_service_apikey(service_name):
     """Get API key for specific service - for internal system use"""
     try:
         # Only SuperAdmin can access API keys
-        user = User.query.get(session['user_id'])
+        user = current_identity()
         if not user.is_superadmin:
             return jsonify({'error': 'SuperAdmin access required'}), 403
         
         # Always use SuperAdmin user for API keys
-        superadmin = User.query.filter_by(email=SUPERADMIN_EMAIL).first()
+        superadmin = get_superadmin()
         if not superadmin:
             return jsonify({'error': 'SuperAdmin not found'}), 404
             
-        api_key = APIKey.query.filter_by(user_id=superadmin.id, name=service_name.lower()).first()
+        credentials = credential_vault.get(superadmin.id, service_name.lower())
         
-        if not api_key:
+        if not credentials:
             return jsonify({'error': f'API key for service "{service_name}" not found'}), 404
         
         # Return decrypted data for system use
         decrypted_data = {
-            'name': api_key.name,
-            'key': decrypt(api_key.key_enc),
-            'secret': decrypt(api_key.secret_enc) if api_key.secret_enc else None,
-            'passphrase': decrypt(api_key.passphrase_enc) if api_key.passphrase_enc else None
+            'name': service_name.lower(),
+            'key': credentials.key,
+            'secret': credentials.secret,
+            'passphrase': credentials.passphrase
         }
         
         log_activity('SERVICE_API_KEY_ACCESSED', f'Accessed API key for service: {service_name}')
@@ -953,6 +1552,7 @@ def admin_reset_password():
         return jsonify({'error': 'User not found'}), 404
     user.password_hash = generate_password_hash(new_password)
     db.session.commit()
+    identity_cache.invalidate(user.id)
     # Always notify MasterAdmin only
     try:
         msg = Message('A password was reset by admin', recipients=[SUPERADMIN_EMAIL])
@@ -991,6 +1591,7 @@ def confirm_admin_reset():
         return jsonify({'error': 'Admin not found'}), 404
     user.password_hash = generate_password_hash(new_password)
     db.session.commit()
+    identity_cache.invalidate(user.id)
     session.pop('admin_reset_code', None)
     return jsonify({'message': 'Admin password reset'})
 
@@ -999,38 +1600,42 @@ def confirm_admin_reset():
 def get_kucoin_contracts():
     """Get all available KuCoin futures contracts"""
     try:
-        # Get user's API keys
-        user = User.query.get(session['user_id'])
-        api_key = APIKey.query.filter_by(user_id=user.id, name='KuCoin').first()
-        if not api_key:
-            return jsonify({'error': 'KuCoin API key not found'}), 404
+        fields = parse_fields(request.args.get('fields'))
+        entry = get_active_contracts()
+        # Each projection is a different body, so the field set is part of the ETag
+        etag = f"{entry.etag}-{zlib.crc32(','.join(fields).encode()):08x}" if fields else entry.etag
+        cached = not_modified(etag)
+        if cached:
+            return mark_age(cached, entry)
+        # Projected and encoded once per snapshot version, field set and encoding
+        contracts = entry.value
+        return mark_age(tag_etag(serializer.render(lambda: {
+            'contracts': project(contracts, fields),
+            'count': len(contracts)
+        }, cache_key=etag), etag), entry)
+    except ProjectionError as e:
+        return jsonify({'error': str(e)}), 400
+    except KucoinAPIError as e:
+        return jsonify({'error': 'Failed to fetch contracts from KuCoin', 'status': e.status}), e.status
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
 
-        # Decrypt API credentials
-        key = decrypt(api_key.key_enc)
-        secret = decrypt(api_key.secret_enc)
-        passphrase = decrypt(api_key.passphrase_enc)
-
-        # Make request to KuCoin API
-        url = 'https://api-futures.kucoin.com/api/v1/contracts/active'
-        headers = {
-            'KC-API-KEY': key,
-            'KC-API-SECRET': secret,
-            'KC-API-PASSPHRASE': passphrase,
-            'KC-API-TIMESTAMP': str(int(time.time() * 1000))
-        }
-        
-        response = requests.get(url, headers=headers)
-        if response.status_code != 200:
-            return jsonify({'error': 'Failed to fetch contracts from KuCoin', 'status': response.status_code}), response.status_code
-        
-        data = response.json()
-        if 'data' not in data:
-            return jsonify({'error': 'Unexpected KuCoin response'}), 500
-            
-        return jsonify({
-            'contracts': data['data'],
-            'count': len(data['data'])
-        })
+@app.route('/api/kucoin/screener', methods=['GET'])
+@login_required
+def get_kucoin_screener():
+    """Filter, sort and page the contract universe server-side"""
+    try:
+        fields = parse_fields(request.args.get('fields'))
+        entry = get_active_contracts()
+        result = screener.search(request.args)
+        if result is None:
+            return jsonify({'error': 'Screener index not ready'}), 503
+        result['contracts'] = project(result['contracts'], fields)
+        return mark_age(serializer.render(result), entry)
+    except (ScreenerError, ProjectionError) as e:
+        return jsonify({'error': str(e)}), 400
+    except KucoinAPIError as e:
+        return jsonify({'error': 'Failed to fetch contracts from KuCoin', 'status': e.status}), e.status
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -1039,38 +1644,17 @@ def get_kucoin_contracts():
 def get_kucoin_funding_rate(symbol):
     """Get funding rate for a specific symbol"""
     try:
-        # Get user's API keys
-        user = User.query.get(session['user_id'])
-        api_key = APIKey.query.filter_by(user_id=user.id, name='KuCoin').first()
-        if not api_key:
-            return jsonify({'error': 'KuCoin API key not found'}), 404
-
-        # Decrypt API credentials
-        key = decrypt(api_key.key_enc)
-        secret = decrypt(api_key.secret_enc)
-        passphrase = decrypt(api_key.passphrase_enc)
-
-        # Make request to KuCoin API
-        url = f'https://api-futures.kucoin.com/api/v1/contracts/{symbol}/funding-rate'
-        headers = {
-            'KC-API-KEY': key,
-            'KC-API-SECRET': secret,
-            'KC-API-PASSPHRASE': passphrase,
-            'KC-API-TIMESTAMP': str(int(time.time() * 1000))
-        }
-        
-        response = requests.get(url, headers=headers)
-        if response.status_code != 200:
-            return jsonify({'error': 'Failed to fetch funding rate from KuCoin', 'status': response.status_code}), response.status_code
-        
-        data = response.json()
-        if 'data' not in data:
-            return jsonify({'error': 'Unexpected KuCoin response'}), 500
-            
-        return jsonify({
+        # Load the snapshot even when cold, so an unlisted symbol never gets a cache
+        contracts = get_active_contracts().value
+        if not any(contract.get('symbol') == symbol for contract in contracts):
+            return jsonify({'error': f'Unknown symbol: {symbol}'}), 404
+        entry = get_funding_rate(symbol)
+        return mark_age(jsonify({
             'symbol': symbol,
-            'funding_rate': data['data']
-        })
+            'funding_rate': entry.value
+        }), entry)
+    except KucoinAPIError as e:
+        return jsonify({'error': 'Failed to fetch funding rate from KuCoin', 'status': e.status}), e.status
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -1079,62 +1663,111 @@ def get_kucoin_funding_rate(symbol):
 def get_kucoin_funding_rates():
     """Get funding rates for all active contracts"""
     try:
-        # Get user's API keys
-        user = User.query.get(session['user_id'])
-        api_key = APIKey.query.filter_by(user_id=user.id, name='KuCoin').first()
-        if not api_key:
-            return jsonify({'error': 'KuCoin API key not found'}), 404
-
-        # Decrypt API credentials
-        key = decrypt(api_key.key_enc)
-        secret = decrypt(api_key.secret_enc)
-        passphrase = decrypt(api_key.passphrase_enc)
-
         # First get all active contracts
-        contracts_url = 'https://api-futures.kucoin.com/api/v1/contracts/active'
-        headers = {
-            'KC-API-KEY': key,
-            'KC-API-SECRET': secret,
-            'KC-API-PASSPHRASE': passphrase,
-            'KC-API-TIMESTAMP': str(int(time.time() * 1000))
-        }
-        
-        contracts_response = requests.get(contracts_url, headers=headers)
-        if contracts_response.status_code != 200:
-            return jsonify({'error': 'Failed to fetch contracts from KuCoin', 'status': contracts_response.status_code}), contracts_response.status_code
+        snapshot = get_active_contracts()
+        contracts = snapshot.value
         
-        contracts_data = contracts_response.json()
-        if 'data' not in contracts_data:
-            return jsonify({'error': 'Unexpected KuCoin response'}), 500
-        
-        # Get funding rates for each contract
+        # Funding fields come with the contracts snapshot; only symbols missing
+        # them need a per-symbol lookup
         funding_rates = []
-        for contract in contracts_data['data']:
-            symbol = contract['symbol']
-            try:
-                # Get funding rate for this symbol
-                funding_url = f'https://api-futures.kucoin.com/api/v1/contracts/{symbol}/funding-rate'
-                funding_response = requests.get(funding_url, headers=headers)
-                
-                if funding_response.status_code == 200:
-                    funding_data = funding_response.json()
-                    if 'data' in funding_data:
-                        funding_rates.append({
-                            'symbol': symbol,
-                            'funding_rate': funding_data['data'].get('fundingRate', 0),
-                            'next_funding_time': funding_data['data'].get('nextFundingTime'),
-                            'mark_price': contract.get('markPrice'),
-                            'index_price': contract.get('indexPrice'),
-                            'price_change_24h': contract.get('priceChgPct', 0)
-                        })
-            except Exception as e:
-                # Continue with other symbols if one fails
-                continue
+        missing = []
+        for contract in contracts:
+            entry = {
+                'symbol': contract['symbol'],
+                'funding_rate': contract.get('fundingFeeRate'),
+                'next_funding_time': contract.get('nextFundingRateTime'),
+                'mark_price': contract.get('markPrice'),
+                'index_price': contract.get('indexPrice'),
+                'price_change_24h': contract.get('priceChgPct', 0)
+            }
+            if entry['funding_rate'] is None or entry['next_funding_time'] is None:
+                missing.append(entry)
+            funding_rates.append(entry)
         
-        return jsonify({
+        if missing:
+            def lookup(entry):
+                try:
+                    return get_funding_rate(entry['symbol'], BACKGROUND).value
+                except Exception as e:
+                    app.logger.warning(f"Funding rate lookup failed for {entry['symbol']}: {e}")
+                    return None
+            
+            workers = min(app.config['KUCOIN_FUNDING_WORKERS'], len(missing))
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                results = list(executor.map(lookup, missing))
+            
+            failed = set()
+            for entry, funding_data in zip(missing, results):
+                if funding_data is None:
+                    # Continue with other symbols if one fails
+                    failed.add(entry['symbol'])
+                    continue
+                if entry['funding_rate'] is None:
+                    entry['funding_rate'] = funding_data.get('fundingRate', 0)
+                if entry['next_funding_time'] is None:
+                    entry['next_funding_time'] = funding_data.get('nextFundingTime')
+            if failed:
+                funding_rates = [entry for entry in funding_rates if entry['symbol'] not in failed]
+        
+        return mark_age(serializer.render({
             'funding_rates': funding_rates,
             'total_count': len(funding_rates)
-        })
+        }), snapshot)
+    except KucoinAPIError as e:
+        return jsonify({'error': 'Failed to fetch contracts from KuCoin', 'status': e.status}), e.status
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/kucoin/funding-history/<symbol>', methods=['GET'])
+@login_required
+def get_kucoin_funding_history(symbol):
+    """Get recorded settled funding rates for a symbol"""
+    limit = min(max(request.args.get('limit', 90, type=int), 1), app.config['KUCOIN_FUNDING_HISTORY_PERIODS'])
+    history = funding_history.history(symbol, limit)
+    return serializer.render({
+        'symbol': symbol,
+        'history': [{'time': ts, 'funding_rate': rate} for ts, rate in history],
+        'count': len(history)
+    })
+
+@app.route('/api/kucoin/funding-analytics', methods=['GET'])
+@login_required
+def get_kucoin_funding_analytics():
+    """Rank every symbol by funding yield or how unusual its current rate is"""
+    try:
+        window = request.args.get('window', 21, type=int)
+        min_samples = max(request.args.get('min_samples', 3, type=int), 1)
+        limit = min(max(request.args.get('limit', 50, type=int), 1), 500)
+        sort = request.args.get('sort', 'zscore')
+        if sort not in ('zscore', 'annualized_yield', 'rate'):
+            return jsonify({'error': 'sort must be one of zscore, annualized_yield, rate'}), 400
+
+        entry = get_active_contracts()
+        analytics = funding_history.analytics(contract_table.table(), window, min_samples)
+
+        # Rank by magnitude so both extreme positive and negative rates surface
+        key = np.abs(analytics[sort])
+        rows = np.flatnonzero(~np.isnan(key))
+        rows = rows[np.argsort(-key[rows], kind='stable')][:limit]
+        to_float = lambda value: None if np.isnan(value) else float(value)
+        results = [{
+            'symbol': analytics['symbol'][row],
+            'funding_rate': to_float(analytics['rate'][row]),
+            'annualized_yield': to_float(analytics['annualized_yield'][row]),
+            'mean': to_float(analytics['mean'][row]),
+            'std': to_float(analytics['std'][row]),
+            'zscore': to_float(analytics['zscore'][row]),
+            'samples': int(analytics['samples'][row])
+        } for row in rows]
+
+        return mark_age(serializer.render({
+            'window': window,
+            'sort': sort,
+            'results': results,
+            'count': len(results)
+        }), entry)
+    except KucoinAPIError as e:
+        return jsonify({'error': 'Failed to fetch contracts from KuCoin', 'status': e.status}), e.status
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -1143,120 +1776,283 @@ def get_kucoin_funding_rates():
 def get_kucoin_market_stats():
     """Get overall market statistics"""
     try:
-        # Get user's API keys
-        user = User.query.get(session['user_id'])
-        api_key = APIKey.query.filter_by(user_id=user.id, name='KuCoin').first()
-        if not api_key:
-            return jsonify({'error': 'KuCoin API key not found'}), 404
-
-        # Decrypt API credentials
-        key = decrypt(api_key.key_enc)
-        secret = decrypt(api_key.secret_enc)
-        passphrase = decrypt(api_key.passphrase_enc)
-
-        # Make request to KuCoin API
-        url = 'https://api-futures.kucoin.com/api/v1/contracts/active'
-        headers = {
-            'KC-API-KEY': key,
-            'KC-API-SECRET': secret,
-            'KC-API-PASSPHRASE': passphrase,
-            'KC-API-TIMESTAMP': str(int(time.time() * 1000))
-        }
-        
-        response = requests.get(url, headers=headers)
-        if response.status_code != 200:
-            return jsonify({'error': 'Failed to fetch market stats from KuCoin', 'status': response.status_code}), response.status_code
-        
-        data = response.json()
-        if 'data' not in data:
-            return jsonify({'error': 'Unexpected KuCoin response'}), 500
-        
-        # Calculate market statistics
-        contracts = data['data']
-        total_volume = sum(float(contract.get('volumeOf24h', 0)) for contract in contracts)
-        total_turnover = sum(float(contract.get('turnoverOf24h', 0)) for contract in contracts)
-        total_open_interest = sum(float(contract.get('openInterest', 0)) for contract in contracts)
-        
-        # Get top gainers and losers
-        sorted_contracts = sorted(contracts, key=lambda x: float(x.get('priceChgPct', 0)), reverse=True)
-        top_gainers = sorted_contracts[:5]
-        top_losers = sorted_contracts[-5:]
+        limit = min(max(request.args.get('limit', 5, type=int), 1), app.config['KUCOIN_STATS_TOP_K'])
+        rank_by = [metric for metric in request.args.get('rank_by', '').split(',') if metric]
+        unknown = [metric for metric in rank_by if metric not in METRICS]
+        if unknown:
+            return jsonify({'error': f'Unknown ranking metric(s): {", ".join(unknown)}', 'metrics': list(METRICS)}), 400
+
+        # Refreshing the snapshot feeds the stats engine; reading it is O(K)
+        entry = get_active_contracts()
+        etag = f'{entry.etag}-{market_stats.version()}-{zlib.crc32(request.query_string):08x}'
+        cached = not_modified(etag)
+        if cached:
+            return mark_age(cached, entry)
+        stats = market_stats.summary(limit)
+        if rank_by:
+            stats['rankings'] = {
+                metric: {
+                    'top': [{'symbol': symbol, 'value': value} for symbol, value in market_stats.ranking(metric, limit)],
+                    'bottom': [{'symbol': symbol, 'value': value} for symbol, value in market_stats.ranking(metric, limit, largest=False)]
+                }
+                for metric in rank_by
+            }
         
-        return jsonify({
-            'total_contracts': len(contracts),
-            'total_volume_24h': total_volume,
-            'total_turnover_24h': total_turnover,
-            'total_open_interest': total_open_interest,
-            'top_gainers': top_gainers,
-            'top_losers': top_losers
-        })
+        return mark_age(tag_etag(serializer.render(stats, cache_key=etag), etag), entry)
+    except KucoinAPIError as e:
+        return jsonify({'error': 'Failed to fetch market stats from KuCoin', 'status': e.status}), e.status
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/kucoin/price/<symbol>', methods=['GET'])
 @login_required
 def get_kucoin_price(symbol):
+    # ?raw=0 drops the full contract dict that duplicates the mapped fields
+    include_raw = request.args.get('raw', '1') != '0'
     try:
-        # Get user's API keys
-        user = User.query.get(session['user_id'])
-        api_key = APIKey.query.filter_by(user_id=user.id, name='KuCoin').first()
-        if not api_key:
-            return jsonify({'error': 'KuCoin API key not found'}), 404
-
-        # Decrypt API credentials
-        key = decrypt(api_key.key_enc)
-        secret = decrypt(api_key.secret_enc)
-        passphrase = decrypt(api_key.passphrase_enc)
-
-        # Make request to KuCoin API
-        url = f'https://api-futures.kucoin.com/api/v1/contracts/{symbol}'
-        headers = {
-            'KC-API-KEY': key,
-            'KC-API-SECRET': secret,
-            'KC-API-PASSPHRASE': passphrase,
-            'KC-API-TIMESTAMP': str(int(time.time() * 1000))
-        }
-        
-        response = requests.get(url, headers=headers)
-        print('--- KuCoin API Response ---')
-        print('Status:', response.status_code)
-        print('Headers:', response.headers)
-        print('Body:', response.text)
-        print('--------------------------')
-        if response.status_code != 200:
-            return jsonify({'error': 'Failed to fetch price from KuCoin', 'kucoin_status': response.status_code, 'kucoin_body': response.text}), response.status_code
+        fields = parse_fields(request.args.get('fields'))
+        if fields is not None:
+            include_raw = 'raw' in fields
+
+        # Serve from the streamed state when it is fresh; otherwise REST re-seeds the 24h statistics
+        contract_data = streamed_state(symbol)
+        if contract_data:
+            return serializer.render(project(price_payload(symbol, contract_data, include_raw), fields))
+
+        contract_data = kucoin.get_contract(symbol)
+        if 'lastTradePrice' not in contract_data:
+            return jsonify({'error': 'Unexpected KuCoin response', 'data': contract_data}), 500
         
-        data = response.json()
-        # Defensive: print the data structure
-        print('Parsed JSON:', data)
-        if 'data' not in data or 'lastTradePrice' not in data['data']:
-            return jsonify({'error': 'Unexpected KuCoin response', 'data': data}), 500
+        # Seed the store (last good state) and let the stream keep this symbol current
+        market_state.seed(symbol, contract_data)
+        if app.config['KUCOIN_STREAM_ENABLED']:
+            market_stream.subscribe([symbol])
         
         # Return comprehensive data
-        contract_data = data['data']
-        return jsonify({
-            'symbol': symbol,
-            'price': contract_data['lastTradePrice'],
-            'mark_price': contract_data.get('markPrice'),
-            'index_price': contract_data.get('indexPrice'),
-            'high_24h': contract_data.get('highPrice'),
-            'low_24h': contract_data.get('lowPrice'),
-            'volume_24h': contract_data.get('volumeOf24h'),
-            'turnover_24h': contract_data.get('turnoverOf24h'),
-            'open_interest': contract_data.get('openInterest'),
-            'price_change_24h': contract_data.get('priceChg'),
-            'price_change_pct_24h': contract_data.get('priceChgPct'),
-            'funding_rate': contract_data.get('fundingFeeRate'),
-            'max_leverage': contract_data.get('maxLeverage'),
-            'status': contract_data.get('status'),
-            'timestamp': contract_data.get('timestamp', None),
-            'raw': contract_data
-        })
+        return serializer.render(project(price_payload(symbol, contract_data, include_raw), fields))
+    except ProjectionError as e:
+        return jsonify({'error': str(e)}), 400
+    except KucoinAPIError as e:
+        # Serve the last good state for this symbol, marked with its age, while KuCoin is failing
+        contract_data = market_state.get(symbol)
+        if contract_data and contract_data.get('lastTradePrice') is not None:
+            app.logger.warning(f"Serving stale price for {symbol}: {e}")
+            return mark_age(serializer.render(project(price_payload(symbol, contract_data, include_raw), fields)),
+                            CacheEntry(contract_data, market_state.age(symbol), True))
+        return jsonify({'error': 'Failed to fetch price from KuCoin', 'kucoin_status': e.status, 'kucoin_body': e.body}), e.status
     except Exception as e:
         import traceback
         print('Exception in get_kucoin_price:', traceback.format_exc())
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/kucoin/prices', methods=['GET'])
+@login_required
+def get_kucoin_prices():
+    """Get prices for ?symbols=A,B,C in one request, from streamed state or the contracts snapshot"""
+    include_raw = request.args.get('raw', '1') != '0'
+    try:
+        fields = parse_fields(request.args.get('fields'))
+        if fields is not None:
+            include_raw = 'raw' in fields
+        symbols = [s.strip() for s in request.args.get('symbols', '').split(',') if s.strip()]
+        if not symbols:
+            return jsonify({'error': 'symbols parameter required'}), 400
+
+        prices = {}
+        for symbol in symbols:
+            contract_data = streamed_state(symbol)
+            if contract_data:
+                prices[symbol] = price_payload(symbol, contract_data, include_raw)
+
+        remaining = [symbol for symbol in symbols if symbol not in prices]
+        if remaining:
+            wanted = set(remaining)
+            entry = get_active_contracts()
+            for contract in entry.value:
+                symbol = contract.get('symbol')
+                if symbol in wanted:
+                    prices[symbol] = price_payload(symbol, contract, include_raw)
+
+        response = serializer.render({
+            'prices': {symbol: project(payload, fields) for symbol, payload in prices.items()},
+            'count': len(prices),
+            'not_found': [symbol for symbol in symbols if symbol not in prices]
+        })
+        return mark_age(response, entry) if remaining else response
+    except ProjectionError as e:
+        return jsonify({'error': str(e)}), 400
+    except KucoinAPIError as e:
+        return jsonify({'error': 'Failed to fetch prices from KuCoin', 'status': e.status}), e.status
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/kucoin/stream', methods=['GET'])
+@login_required
+def stream_kucoin_prices():
+    """Push price updates for ?symbols=A,B,C to the client as Server-Sent Events"""
+    symbols = [s.strip() for s in request.args.get('symbols', '').split(',') if s.strip()]
+    if not symbols:
+        return jsonify({'error': 'symbols parameter required'}), 400
+    if len(symbols) > app.config['KUCOIN_SSE_MAX_SYMBOLS']:
+        return jsonify({'error': f"At most {app.config['KUCOIN_SSE_MAX_SYMBOLS']} symbols per stream"}), 400
+
+    # Only listed symbols may join the upstream subscription, which is re-sent on every reconnect
+    try:
+        listed = {contract.get('symbol'): contract for contract in get_active_contracts().value}
+    except KucoinAPIError as e:
+        return jsonify({'error': 'Failed to fetch contracts from KuCoin', 'status': e.status}), e.status
+    unknown = [symbol for symbol in symbols if symbol not in listed]
+    if unknown:
+        return jsonify({'error': f"Unknown symbols: {', '.join(unknown)}"}), 404
+
+    # Seed symbols we have no state for yet from the shared contracts snapshot
+    for symbol in symbols:
+        if market_state.get(symbol) is None:
+            market_state.seed(symbol, listed[symbol])
+
+    if app.config['KUCOIN_STREAM_ENABLED']:
+        market_stream.subscribe(symbols)
+
+    subscription = price_hub.subscribe(symbols)
+    if subscription is None:
+        return jsonify({'error': 'Too many stream clients, try again later'}), 503
+    heartbeat = app.config['KUCOIN_SSE_HEARTBEAT']
+
+    def generate():
+        try:
+            # Initial snapshot, then live updates
+            for symbol in symbols:
+                state = market_state.get(symbol)
+                if state:
+                    yield PriceHub.encode('price', price_event(symbol, state))
+            while not subscription.dropped:
+                event = subscription.next_event(timeout=heartbeat)
+                yield event if event is not None else ': keepalive\n\n'
+            # Not named 'error': EventSource routes that to onerror, which clients treat as a failed connection
+            yield PriceHub.encode('dropped', json.dumps({'error': 'Slow consumer dropped, reconnect'}))
+        finally:
+            price_hub.unsubscribe(subscription)
+
+    return Response(generate(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+
+@app.route('/api/kucoin/klines/<symbol>', methods=['GET'])
+@login_required
+def get_kucoin_klines(symbol):
+    """Get candles for a symbol from the local kline store (never calls KuCoin)"""
+    interval = request.args.get('interval', '1m')
+    if interval not in INTERVALS:
+        return jsonify({'error': f'interval must be one of {", ".join(INTERVALS)}'}), 400
+    now_ms = int(time.time() * 1000)
+    end_ms = request.args.get('to', now_ms, type=int)
+    start_ms = request.args.get('from', 0, type=int)
+    limit = min(max(request.args.get('limit', 500, type=int), 1), app.config['KUCOIN_KLINE_MAX_LIMIT'])
+
+    # Only listed symbols may join the ingest set, or every typo would be backfilled forever
+    try:
+        contracts = get_active_contracts().value
+    except KucoinAPIError:
+        contracts = None
+    listed = contracts is not None and any(contract.get('symbol') == symbol for contract in contracts)
+    if contracts is not None and not listed:
+        return jsonify({'error': f'Unknown symbol: {symbol}'}), 404
+    # Unseen symbols join the ingest set; history appears after the next ingest pass
+    backfill_pending = False
+    if listed and app.config['KUCOIN_KLINE_ENABLED']:
+        # The set is shared; whichever process holds the 'klines' lease ingests it
+        if kline_ingestor.track(symbol):
+            scheduler.run_soon('klines')
+        backfill_pending = kline_store.latest_ts(symbol) is None
+
+    candles = kline_store.read(symbol, start_ms, end_ms, interval, limit)
+    return serializer.render({
+        'symbol': symbol,
+        'interval': interval,
+        'columns': ['ts', 'open', 'high', 'low', 'close', 'volume', 'turnover'],
+        'candles': candles,
+        'count': len(candles),
+        'backfill_pending': backfill_pending
+    })
+
+@app.route('/api/kucoin/account-overview', methods=['GET'])
+@login_required
+def get_kucoin_account_overview():
+    """Get the user's KuCoin Futures account overview (signed private call)"""
+    try:
+        signer = get_kucoin_signer(session['user_id'])
+        if not signer:
+            return jsonify({'error': 'KuCoin API key not found'}), 404
+
+        currency = request.args.get('currency', 'USDT')
+        return jsonify({'account': kucoin_private.get_account_overview(signer, currency)})
+    except IncompleteCredentials as e:
+        return jsonify({'error': f'KuCoin {e}', 'missing': e.missing}), 400
+    except KucoinAPIError as e:
+        return private_error(e, 'account overview')
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/kucoin/positions', methods=['GET'])
+@login_required
+def get_kucoin_positions():
+    """Get the user's open KuCoin Futures positions (signed private call)"""
+    try:
+        signer = get_kucoin_signer(session['user_id'])
+        if not signer:
+            return jsonify({'error': 'KuCoin API key not found'}), 404
+
+        positions = kucoin_private.get_positions(signer) or []
+        return jsonify({'positions': positions, 'count': len(positions)})
+    except IncompleteCredentials as e:
+        return jsonify({'error': f'KuCoin {e}', 'missing': e.missing}), 400
+    except KucoinAPIError as e:
+        return private_error(e, 'positions')
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/kucoin/cache', methods=['GET'])
+@login_required
+@admin_required
+def get_kucoin_cache_stats():
+    """Get KuCoin market data cache statistics"""
+    return jsonify({'caches': [contracts_cache.stats()]})
+
+@app.route('/api/kucoin/cache', methods=['DELETE'])
+@login_required
+@superadmin_required
+def invalidate_kucoin_cache():
+    """Drop the cached KuCoin snapshots so the next request refetches them"""
+    contracts_cache.invalidate()
+    log_activity('KUCOIN_CACHE_INVALIDATED', 'KuCoin market data cache invalidated')
+    return jsonify({'message': 'KuCoin cache invalidated'})
+
+@app.route('/api/kucoin/metrics', methods=['GET'])
+@login_required
+@admin_required
+def get_kucoin_metrics():
+    """Get KuCoin client, connection pool and cache metrics"""
+    return jsonify({
+        'client': kucoin.stats(),
+        'caches': [contracts_cache.stats()],
+        'market_stats': market_stats.stats(),
+        'contract_table': contract_table.stats(),
+        'screener': screener.stats(),
+        'singleflight': upstream_flight.stats(),
+        'rate_limits': kucoin_limiter.stats(),
+        'stream': market_stream.stats(),
+        'sse': price_hub.stats(),
+        'klines': kline_ingestor.stats(),
+        'funding_history': dict(funding_history.stats(), recorder=funding_recorder.stats()),
+        'serialization': serializer.stats(),
+        'scheduler': scheduler.stats(),
+        'server_clock': server_clock.stats(),
+        'credential_vault': credential_vault.stats(),
+        'identity_cache': identity_cache.stats(),
+        'activity_log_writer': audit_writer.stats()
+    })
+
 @app.route('/api/roadmap', methods=['GET'])
 def get_roadmap():
     """Get roadmap data for the frontend"""
@@ -1264,6 +2060,12 @@ def get_roadmap():
         # Read roadmap data from ROADMAP.md file
         roadmap_file = '../ROADMAP.md'
         if os.path.exists(roadmap_file):
+            # The file's mtime and size identify its content without reading it
+            stat = os.stat(roadmap_file)
+            etag = f'roadmap-{stat.st_mtime_ns:x}-{stat.st_size:x}'
+            cached = not_modified(etag, negotiated=False)
+            if cached:
+                return cached
             with open(roadmap_file, 'r', encoding='utf-8') as f:
                 content = f.read()
             
@@ -1284,10 +2086,10 @@ def get_roadmap():
                 'achievements': achievements
             }
             
-            return jsonify({
+            return tag_etag(jsonify({
                 'success': True,
                 'roadmap': roadmap_data
-            })
+            }), etag, negotiated=False)
         else:
             # Fallback data if file doesn't exist
             return jsonify({
@@ -1311,6 +2113,7 @@ def get_roadmap():
         return jsonify({'error': 'Failed to get roadmap data'}), 500
 
 if __name__ == '__main__':
-    with app.app_context():
-        db.create_all()
+    # The debug reloader re-executes this file; only its child process serves requests
+    if os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        start_background_services()
     app.run(debug=True, port=5001) 
\ No newline at end of file
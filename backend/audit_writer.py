@@ -0,0 +1,204 @@
+"""
+Buffered writer for activity-log (audit) events.
+
+Request handlers submit() plain event dicts, which only costs a queue put.
+A background thread collects them into batches and hands each batch to
+write_batch (one multi-row INSERT and one commit), as soon as batch_size
+events are waiting or flush_interval seconds after the first one arrived.
+On SQLite that turns one fsync per request into one per batch.
+
+The queue is bounded: when the writer cannot keep up, new events are
+dropped and counted instead of growing memory without limit. Critical events
+(failed logins, denied access) are never dropped; when the queue is full they
+are written synchronously in the caller's thread instead. stop() drains
+whatever is queued before returning, and is registered to run at interpreter
+exit.
+
+max_lag() is the longest any event has waited between submit() and its
+batch being committed, so readers that assume inserts follow submit order
+closely know how far they may trail.
+"""
+import logging
+import queue
+import threading
+import time
+
+_STOP = object()
+
+
+class AuditWriter:
+    """Bounded queue plus a background thread that writes events in batches"""
+
+    def __init__(self, write_batch, batch_size=100, flush_interval=0.5, max_queue=10000, logger=None):
+        self._write_batch = write_batch
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._logger = logger or logging.getLogger(__name__)
+        self._lock = threading.Lock()
+        self._thread = None
+        self._stopped = False
+        self._enqueued = 0
+        self._dropped = 0
+        self._written_inline = 0
+        self._written = 0
+        self._failed = 0
+        self._batches = 0
+        self._max_depth = 0
+        self._write_seconds = 0.0
+        self._max_lag = 0.0
+        self._last_error = None
+
+    def start(self):
+        with self._lock:
+            if self._thread and self._thread.is_alive():
+                return
+            self._stopped = False
+            self._thread = threading.Thread(target=self._run, name='audit-writer', daemon=True)
+            self._thread.start()
+
+    def submit(self, event, critical=False):
+        """Queue one event; returns False if it was dropped because the queue is full
+
+        A critical event that finds the queue full is written right away instead.
+        """
+        if self._thread is None:
+            self.start()
+        try:
+            self._queue.put_nowait((time.monotonic(), event))
+        except queue.Full:
+            if critical:
+                return self._write_inline(event)
+            with self._lock:
+                self._dropped += 1
+            return False
+        with self._lock:
+            self._enqueued += 1
+            self._max_depth = max(self._max_depth, self._queue.qsize())
+        return True
+
+    def flush(self, timeout=5.0):
+        """Block until every event queued so far has been written (or failed)"""
+        deadline = time.monotonic() + timeout
+        while self._queue.unfinished_tasks and time.monotonic() < deadline:
+            time.sleep(0.01)
+        return not self._queue.unfinished_tasks
+
+    def stop(self, timeout=5.0):
+        """Write out everything still queued, then end the writer thread"""
+        thread = self._thread
+        if thread is None or not thread.is_alive() or self._stopped:
+            return
+        self._stopped = True
+        try:
+            self._queue.put(_STOP, timeout=timeout)
+        except queue.Full:
+            pass
+        thread.join(timeout)
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is _STOP:
+                self._queue.task_done()
+                self._drain()
+                return
+            batch = [item]
+            deadline = time.monotonic() + self.flush_interval
+            stop = False
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    self._queue.task_done()
+                    stop = True
+                    break
+                batch.append(item)
+            self._write(batch)
+            if stop:
+                self._drain()
+                return
+
+    def _drain(self):
+        batch = []
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is _STOP:
+                self._queue.task_done()
+                continue
+            batch.append(item)
+            if len(batch) >= self.batch_size:
+                self._write(batch)
+                batch = []
+        if batch:
+            self._write(batch)
+
+    def _write(self, batch):
+        """Write [(submitted_at, event)] in one call to write_batch"""
+        started = time.perf_counter()
+        try:
+            self._write_batch([event for _, event in batch])
+            lag = time.monotonic() - min(submitted_at for submitted_at, _ in batch)
+            with self._lock:
+                self._written += len(batch)
+                self._max_lag = max(self._max_lag, lag)
+        except Exception as e:
+            with self._lock:
+                self._failed += len(batch)
+                self._last_error = str(e)
+            self._logger.error(f'Failed to write {len(batch)} activity log events: {e}')
+        finally:
+            elapsed = time.perf_counter() - started
+            with self._lock:
+                self._batches += 1
+                self._write_seconds += elapsed
+            for _ in batch:
+                self._queue.task_done()
+
+    def _write_inline(self, event):
+        try:
+            self._write_batch([event])
+        except Exception as e:
+            with self._lock:
+                self._failed += 1
+                self._last_error = str(e)
+            self._logger.error(f'Failed to write critical activity log event: {e}')
+            return False
+        with self._lock:
+            self._written += 1
+            self._written_inline += 1
+        return True
+
+    def max_lag(self):
+        """Longest submit-to-commit delay seen so far, in seconds"""
+        with self._lock:
+            return self._max_lag
+
+    def stats(self):
+        with self._lock:
+            return {
+                'running': bool(self._thread and self._thread.is_alive()),
+                'queue_depth': self._queue.qsize(),
+                'max_queue_depth': self._max_depth,
+                'queue_capacity': self._queue.maxsize,
+                'batch_size': self.batch_size,
+                'flush_interval_seconds': self.flush_interval,
+                'enqueued': self._enqueued,
+                'dropped': self._dropped,
+                'written_inline': self._written_inline,
+                'written': self._written,
+                'failed': self._failed,
+                'batches': self._batches,
+                'avg_batch_size': round((self._written - self._written_inline) / self._batches, 2) if self._batches else None,
+                'max_lag_seconds': round(self._max_lag, 3),
+                'avg_write_ms': round(self._write_seconds / self._batches * 1000, 3) if self._batches else None,
+                'last_error': self._last_error
+            }
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Benchmark response encodings for the KuCoin market-data routes.
+
+Builds payloads shaped like each route's response from a synthetic contract
+universe and prints bytes and encode time for every available format and
+compression. Usage: python bench_serialization.py [contracts] [iterations]
+"""
+import gzip
+import json
+import os
+import sys
+import time
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from serialization import orjson, msgpack, brotli
+
+
+def make_contract(i):
+    price = 100.0 + i * 1.37
+    return {
+        'symbol': f'SYM{i}USDTM', 'rootSymbol': 'USDT', 'type': 'FFWCSX', 'baseCurrency': f'SYM{i}',
+        'quoteCurrency': 'USDT', 'settleCurrency': 'USDT', 'status': 'Open', 'maxLeverage': 75,
+        'multiplier': 0.001, 'tickSize': 0.1, 'lotSize': 1, 'markPrice': price, 'indexPrice': price - 0.02,
+        'lastTradePrice': price + 0.01, 'highPrice': price * 1.04, 'lowPrice': price * 0.97,
+        'priceChg': price * 0.012, 'priceChgPct': 0.012, 'volumeOf24h': 1234567.0 + i,
+        'turnoverOf24h': 98765432.1 + i, 'openInterest': str(555000 + i), 'fundingFeeRate': 0.0001,
+        'predictedFundingFeeRate': 0.00012, 'nextFundingRateTime': 14400000, 'fundingRateGranularity': 28800000,
+        'isInverse': False, 'isQuanto': False, 'makerFeeRate': 0.0002, 'takerFeeRate': 0.0006
+    }
+
+
+def price(contract, include_raw):
+    payload = {
+        'symbol': contract['symbol'], 'price': contract['lastTradePrice'], 'mark_price': contract['markPrice'],
+        'index_price': contract['indexPrice'], 'high_24h': contract['highPrice'], 'low_24h': contract['lowPrice'],
+        'volume_24h': contract['volumeOf24h'], 'turnover_24h': contract['turnoverOf24h'],
+        'open_interest': contract['openInterest'], 'price_change_24h': contract['priceChg'],
+        'price_change_pct_24h': contract['priceChgPct'], 'funding_rate': contract['fundingFeeRate'],
+        'max_leverage': contract['maxLeverage'], 'status': contract['status'], 'timestamp': None
+    }
+    if include_raw:
+        payload['raw'] = contract
+    return payload
+
+
+def routes(contracts):
+    watchlist = contracts[:10]
+    return {
+        '/api/kucoin/contracts': {'contracts': contracts, 'count': len(contracts)},
+        '/api/kucoin/market-stats': {'total_contracts': len(contracts), 'top_gainers': contracts[:5],
+                                     'top_losers': contracts[-5:]},
+        '/api/kucoin/price (raw)': price(contracts[0], True),
+        '/api/kucoin/price?raw=0': price(contracts[0], False),
+        '/api/kucoin/prices (10, raw)': {'prices': {c['symbol']: price(c, True) for c in watchlist}},
+        '/api/kucoin/prices?raw=0 (10)': {'prices': {c['symbol']: price(c, False) for c in watchlist}},
+    }
+
+
+def encoders():
+    found = {'json (stdlib)': lambda payload: json.dumps(payload).encode('utf-8')}
+    if orjson is not None:
+        found['orjson'] = orjson.dumps
+    if msgpack is not None:
+        found['msgpack'] = lambda payload: msgpack.packb(payload, use_bin_type=True)
+    return found
+
+
+def compressors():
+    found = {'none': None, 'gzip': lambda body: gzip.compress(body, compresslevel=5)}
+    if brotli is not None:
+        found['br'] = lambda body: brotli.compress(body, quality=4)
+    return found
+
+
+def timed(fn, arg, iterations):
+    started = time.perf_counter()
+    for _ in range(iterations):
+        result = fn(arg)
+    return result, (time.perf_counter() - started) / iterations * 1e6
+
+
+if __name__ == '__main__':
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+    iterations = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+    contracts = [make_contract(i) for i in range(count)]
+
+    print(f"\n=== Serialization benchmark: {count} contracts, {iterations} iterations ===\n")
+    print(f"{'route':32} {'format':14} {'compression':11} {'bytes':>10} {'encode us':>11} {'compress us':>12}")
+    for route, payload in routes(contracts).items():
+        for format_name, encode in encoders().items():
+            body, encode_us = timed(encode, payload, iterations)
+            for compression, compress in compressors().items():
+                if compress is None:
+                    sent, compress_us = body, 0.0
+                else:
+                    sent, compress_us = timed(compress, body, iterations)
+                print(f"{route:32} {format_name:14} {compression:11} {len(sent):>10} {encode_us:>11.1f} {compress_us:>12.1f}")
+        print()
@@ -2,6 +2,7 @@ import os
 from flask import Flask
 from flask_sqlalchemy import SQLAlchemy
 from dotenv import load_dotenv
+from credential_vault import touch_stamp
 
 load_dotenv()
 
@@ -22,4 +23,6 @@ class APIKey(db.Model):
 with app.app_context():
     num_deleted = APIKey.query.delete()
     db.session.commit()
+    # A running server drops its cached decrypted keys on its next lookup
+    touch_stamp(os.environ.get('CREDENTIAL_VAULT_STAMP', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'credentials.stamp')))
     print(f"Deleted {num_deleted} API keys from the database.") 
\ No newline at end of file
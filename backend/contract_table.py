@@ -0,0 +1,183 @@
+"""
+Columnar snapshot of the KuCoin contract universe.
+
+The contracts endpoint returns a list of dicts, which forces every consumer
+into per-dict Python loops with float() conversions. ContractTable holds the
+numeric fields as float64 NumPy columns (NaN where KuCoin sent nothing) plus
+a symbol -> row index, so stats, screeners and risk checks can run as
+vectorized operations.
+
+Tables are immutable: a refresh builds a new one, and a streamed update
+copies only the columns it touches. Readers grab the current table once and
+never see a half-applied change.
+"""
+import threading
+import time
+
+import numpy as np
+
+# Column name -> KuCoin contract field
+COLUMNS = {
+    'mark_price': 'markPrice',
+    'index_price': 'indexPrice',
+    'last_price': 'lastTradePrice',
+    'price_change_pct': 'priceChgPct',
+    'volume': 'volumeOf24h',
+    'turnover': 'turnoverOf24h',
+    'open_interest': 'openInterest',
+    'funding': 'fundingFeeRate',
+    'funding_granularity': 'fundingRateGranularity',
+    'max_leverage': 'maxLeverage',
+    'tick_size': 'tickSize',
+    'lot_size': 'lotSize',
+    'multiplier': 'multiplier'
+}
+FIELDS = {field: column for column, field in COLUMNS.items()}
+
+
+def _float(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return np.nan
+
+
+class ContractTable:
+    """Immutable columnar view of a contracts snapshot"""
+
+    def __init__(self, symbols, columns, version, built_at=None):
+        self.symbols = symbols
+        self.columns = columns
+        self.version = version
+        self.built_at = built_at or time.time()
+        self.index = {symbol: row for row, symbol in enumerate(symbols)}
+
+    @classmethod
+    def from_contracts(cls, contracts, version=0):
+        contracts = [contract for contract in contracts if contract.get('symbol')]
+        symbols = np.array([contract['symbol'] for contract in contracts], dtype=object)
+        columns = {
+            column: np.fromiter((_float(contract.get(field)) for contract in contracts),
+                                dtype=np.float64, count=len(contracts))
+            for column, field in COLUMNS.items()
+        }
+        return cls(symbols, columns, version)
+
+    def __len__(self):
+        return len(self.symbols)
+
+    def __getitem__(self, column):
+        return self.columns[column]
+
+    def patched(self, symbol, fields):
+        """Return a new table with KuCoin fields for one symbol applied, or self if nothing changed"""
+        row = self.index.get(symbol)
+        if row is None:
+            return self
+        columns = None
+        for field, value in fields.items():
+            column = FIELDS.get(field)
+            if column is None or value is None:
+                continue
+            value = _float(value)
+            current = self.columns[column][row]
+            if value == current or (np.isnan(value) and np.isnan(current)):
+                continue
+            if columns is None:
+                columns = dict(self.columns)
+            if columns[column] is self.columns[column]:
+                columns[column] = columns[column].copy()
+            columns[column][row] = value
+        if columns is None:
+            return self
+        table = ContractTable.__new__(ContractTable)
+        table.symbols = self.symbols
+        table.columns = columns
+        table.version = self.version + 1
+        table.built_at = self.built_at
+        table.index = self.index
+        return table
+
+    def rows(self, symbols):
+        """Row numbers for the given symbols, skipping unknown ones"""
+        return np.array([self.index[symbol] for symbol in symbols if symbol in self.index], dtype=np.intp)
+
+    def top(self, column, n, largest=True, mask=None):
+        """Row numbers of the n largest (or smallest) non-NaN values, best first"""
+        values = self.columns[column]
+        valid = ~np.isnan(values)
+        if mask is not None:
+            valid &= mask
+        candidates = np.flatnonzero(valid)
+        if n <= 0 or not len(candidates):
+            return candidates[:0]
+        keyed = -values[candidates] if largest else values[candidates]
+        if n < len(candidates):
+            picked = np.argpartition(keyed, n - 1)[:n]
+            candidates, keyed = candidates[picked], keyed[picked]
+        return candidates[np.argsort(keyed, kind='stable')]
+
+    def total(self, column, mask=None):
+        values = self.columns[column] if mask is None else self.columns[column][mask]
+        return float(np.nansum(values))
+
+    def records(self, rows, columns=None):
+        """[{symbol, column: value}] for the given rows, NaN rendered as None"""
+        columns = columns or list(self.columns)
+        out = []
+        for row in rows:
+            record = {'symbol': self.symbols[row]}
+            for column in columns:
+                value = self.columns[column][row]
+                record[column] = None if np.isnan(value) else float(value)
+            out.append(record)
+        return out
+
+    def nbytes(self):
+        return sum(column.nbytes for column in self.columns.values())
+
+
+class ContractTableStore:
+    """Holds the current ContractTable; rebuilt on each snapshot, patched from the stream"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._table = ContractTable.from_contracts([])
+        self._rebuilds = 0
+        self._patches = 0
+        self._build_seconds = 0.0
+
+    def rebuild(self, contracts):
+        started = time.perf_counter()
+        with self._lock:
+            version = self._table.version + 1
+        table = ContractTable.from_contracts(contracts, version)
+        with self._lock:
+            self._table = table
+            self._rebuilds += 1
+            self._build_seconds = time.perf_counter() - started
+
+    def patch(self, symbol, fields):
+        with self._lock:
+            table = self._table.patched(symbol, fields)
+            if table is not self._table:
+                self._table = table
+                self._patches += 1
+
+    def table(self):
+        with self._lock:
+            return self._table
+
+    def stats(self):
+        with self._lock:
+            table = self._table
+            return {
+                'rows': len(table),
+                'columns': list(table.columns),
+                'version': table.version,
+                'age_seconds': round(time.time() - table.built_at, 3),
+                'nbytes': table.nbytes(),
+                'rebuilds': self._rebuilds,
+                'patches': self._patches,
+                'last_build_ms': round(self._build_seconds * 1000, 3)
+            }
@@ -0,0 +1,138 @@
+"""
+In-memory cache of decrypted API credentials.
+
+Routes that sign upstream calls need the decrypted key, secret and
+passphrase on every poll; loading them means an APIKey query and three
+Fernet decrypts. CredentialVault keeps the decrypted Credentials per
+(owner, service) for a TTL, including "no such key" results, so repeated
+polls cost a dict lookup. get_derived() keeps one object built from the
+credentials (a request signer) on the same entry, so it lives and dies with
+them.
+
+Writers call invalidate() after changing a key. Besides dropping the local
+entries it touches a stamp file; every vault sharing the stamp (other worker
+processes, or the server while clear_apikeys.py runs beside it) sees the new
+mtime on its next lookup and drops everything it holds.
+"""
+import os
+import threading
+import time
+from collections import namedtuple
+
+Credentials = namedtuple('Credentials', ['key', 'secret', 'passphrase'])
+
+_MISSING = object()
+
+
+def touch_stamp(path):
+    """Mark every vault using this stamp file as out of date"""
+    if not path:
+        return
+    with open(path, 'a'):
+        pass
+    os.utime(path, None)
+
+
+def stamp_mtime(path):
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+
+class CredentialVault:
+    """TTL cache of decrypted Credentials keyed by (owner, service)"""
+
+    def __init__(self, loader, ttl=300.0, max_entries=256, stamp_path=None):
+        self._loader = loader
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.stamp_path = stamp_path
+        self._lock = threading.Lock()
+        self._entries = {}
+        # Bumped by every invalidation so a load that raced one is not cached
+        self._generation = 0
+        self._stamp = stamp_mtime(stamp_path) if stamp_path else None
+        self._hits = 0
+        self._misses = 0
+        self._loads = 0
+        self._invalidations = 0
+        self._external_invalidations = 0
+
+    def _check_stamp(self):
+        if not self.stamp_path:
+            return
+        stamp = stamp_mtime(self.stamp_path)
+        if stamp != self._stamp:
+            self._stamp = stamp
+            self._entries.clear()
+            self._generation += 1
+            self._external_invalidations += 1
+
+    def get(self, owner, service):
+        """Return Credentials for (owner, service), or None if no such key is stored"""
+        cache_key = (owner, service)
+        now = time.monotonic()
+        with self._lock:
+            self._check_stamp()
+            entry = self._entries.get(cache_key)
+            if entry is not None and now - entry[1] < self.ttl:
+                self._hits += 1
+                return None if entry[0] is _MISSING else entry[0]
+            self._misses += 1
+            generation = self._generation
+
+        credentials = self._loader(owner, service)
+        with self._lock:
+            self._loads += 1
+            if generation == self._generation:
+                if len(self._entries) >= self.max_entries:
+                    self._entries.clear()
+                self._entries[cache_key] = (_MISSING if credentials is None else credentials, now, None)
+        return credentials
+
+    def get_derived(self, owner, service, build):
+        """Return build(credentials) for (owner, service), built once per cache entry; None if no key is stored"""
+        credentials = self.get(owner, service)
+        if credentials is None:
+            return None
+        cache_key = (owner, service)
+        with self._lock:
+            entry = self._entries.get(cache_key)
+            if entry is not None and entry[0] is credentials and entry[2] is not None:
+                return entry[2]
+        derived = build(credentials)
+        with self._lock:
+            entry = self._entries.get(cache_key)
+            # Only attach to the entry the credentials came from, never to a reloaded one
+            if entry is not None and entry[0] is credentials:
+                self._entries[cache_key] = (entry[0], entry[1], derived)
+        return derived
+
+    def invalidate(self, owner=None, service=None):
+        """Drop cached credentials for one key, one owner, or everything; other processes follow via the stamp"""
+        with self._lock:
+            if owner is None:
+                self._entries.clear()
+            else:
+                for cache_key in [k for k in self._entries if k[0] == owner and service in (None, k[1])]:
+                    del self._entries[cache_key]
+            self._generation += 1
+            self._invalidations += 1
+            touch_stamp(self.stamp_path)
+            # Our own touch is not news to us
+            self._stamp = stamp_mtime(self.stamp_path) if self.stamp_path else None
+
+    def stats(self):
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                'ttl_seconds': self.ttl,
+                'entries': len(self._entries),
+                'hits': self._hits,
+                'misses': self._misses,
+                'hit_ratio': round(self._hits / lookups, 4) if lookups else None,
+                'loads': self._loads,
+                'invalidations': self._invalidations,
+                'external_invalidations': self._external_invalidations
+            }
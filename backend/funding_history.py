@@ -0,0 +1,181 @@
+"""
+Funding-rate history and vectorized funding analytics.
+
+FundingRecorder watches contracts snapshots. Each contract's rate is held
+against its upcoming settlement time (now + nextFundingRateTime); once that
+slot rolls over, the last rate seen for it is written to a compact SQLite
+table, giving one row per symbol per funding interval.
+
+FundingHistory keeps the recent history as a symbols x periods NumPy matrix
+(right-aligned, NaN padded) so yield, rolling mean/std and z-scores for every
+symbol come out of a single vectorized pass.
+"""
+import sqlite3
+import threading
+import time
+
+import numpy as np
+
+YEAR_MS = 365 * 24 * 3600 * 1000
+DEFAULT_GRANULARITY_MS = 8 * 3600 * 1000
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS funding_rates (
+    symbol TEXT NOT NULL,
+    ts INTEGER NOT NULL,
+    rate REAL NOT NULL,
+    PRIMARY KEY (symbol, ts)
+) WITHOUT ROWID
+"""
+
+
+class FundingHistory:
+    """SQLite funding-rate history with an in-memory matrix of the last max_periods rates"""
+
+    def __init__(self, path, max_periods=270):
+        self.path = path
+        self.max_periods = max_periods
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._matrix = None
+        self._rows_written = 0
+        self._matrix_builds = 0
+        with self._connect() as conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute(SCHEMA)
+
+    def _connect(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10)
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    def write(self, rows):
+        """Upsert [(symbol, settlement_ts, rate)]"""
+        if not rows:
+            return 0
+        with self._connect() as conn:
+            conn.executemany('INSERT OR REPLACE INTO funding_rates (symbol, ts, rate) VALUES (?, ?, ?)', rows)
+        with self._lock:
+            self._rows_written += len(rows)
+            self._matrix = None
+        return len(rows)
+
+    def history(self, symbol, limit=100):
+        """[(ts, rate)] for symbol, oldest first"""
+        rows = self._connect().execute(
+            'SELECT ts, rate FROM funding_rates WHERE symbol = ? ORDER BY ts DESC LIMIT ?', (symbol, limit)
+        ).fetchall()
+        return rows[::-1]
+
+    def matrix(self):
+        """(symbols, index, rates) with rates[i, -n:] holding symbol i's last n rates, oldest first"""
+        with self._lock:
+            if self._matrix is not None:
+                return self._matrix
+        rows = self._connect().execute(
+            'SELECT symbol, rate FROM ('
+            '  SELECT symbol, ts, rate, ROW_NUMBER() OVER (PARTITION BY symbol ORDER BY ts DESC) AS age'
+            '  FROM funding_rates'
+            ') WHERE age <= ? ORDER BY symbol, ts', (self.max_periods,)
+        ).fetchall()
+        by_symbol = {}
+        for symbol, rate in rows:
+            by_symbol.setdefault(symbol, []).append(rate)
+        symbols = sorted(by_symbol)
+        rates = np.full((len(symbols), self.max_periods), np.nan)
+        for row, symbol in enumerate(symbols):
+            values = by_symbol[symbol]
+            rates[row, self.max_periods - len(values):] = values
+        matrix = (symbols, {symbol: row for row, symbol in enumerate(symbols)}, rates)
+        with self._lock:
+            self._matrix = matrix
+            self._matrix_builds += 1
+        return matrix
+
+    def analytics(self, table, window=21, min_samples=3):
+        """Per-symbol funding analytics over the contract table's current rates.
+
+        Returns a dict of equal-length arrays: symbol, rate, annualized_yield,
+        mean, std, zscore and samples. The rolling statistics cover the last
+        window settled rates; z-scores compare the current rate against them.
+        """
+        symbols, index, rates = self.matrix()
+        window = max(1, min(window, self.max_periods))
+        rows = len(table)
+        recent = np.full((rows, window), np.nan)
+        # Align history rows to contract table rows
+        table_rows, history_rows = [], []
+        for symbol, history_row in index.items():
+            table_row = table.index.get(symbol)
+            if table_row is not None:
+                table_rows.append(table_row)
+                history_rows.append(history_row)
+        if table_rows:
+            recent[table_rows] = rates[history_rows, -window:]
+
+        current = table['funding']
+        granularity = table['funding_granularity']
+        granularity = np.where(np.isnan(granularity) | (granularity <= 0), DEFAULT_GRANULARITY_MS, granularity)
+        samples = np.sum(~np.isnan(recent), axis=1)
+        enough = samples >= min_samples
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean = np.where(enough, np.nanmean(np.where(enough[:, None], recent, 0.0), axis=1), np.nan)
+            std = np.where(enough, np.nanstd(np.where(enough[:, None], recent, 0.0), axis=1), np.nan)
+            zscore = np.where(std > 0, (current - mean) / std, np.nan)
+        return {
+            'symbol': table.symbols,
+            'rate': current,
+            'annualized_yield': current * (YEAR_MS / granularity),
+            'mean': mean,
+            'std': std,
+            'zscore': zscore,
+            'samples': samples
+        }
+
+    def stats(self):
+        with self._lock:
+            return {
+                'path': self.path,
+                'rows_written': self._rows_written,
+                'matrix_builds': self._matrix_builds,
+                'max_periods': self.max_periods
+            }
+
+
+class FundingRecorder:
+    """Turns contracts snapshots into one settled funding-rate row per symbol per interval"""
+
+    def __init__(self, history, clock=time.time):
+        self.history = history
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._pending = {}
+        self._snapshots = 0
+        self._recorded = 0
+
+    def record(self, contracts):
+        now_ms = int(self._clock() * 1000)
+        settled = []
+        with self._lock:
+            self._snapshots += 1
+            for contract in contracts:
+                symbol = contract.get('symbol')
+                rate = contract.get('fundingFeeRate')
+                until_next = contract.get('nextFundingRateTime')
+                if not symbol or rate is None or until_next is None:
+                    continue
+                # Round to the minute so polling jitter maps to one slot
+                slot = int(round((now_ms + until_next) / 60000.0)) * 60000
+                pending = self._pending.get(symbol)
+                if pending is not None and pending[0] != slot and pending[0] <= now_ms + 60000:
+                    settled.append((symbol, pending[0], pending[1]))
+                self._pending[symbol] = (slot, float(rate))
+            self._recorded += len(settled)
+        self.history.write(settled)
+
+    def stats(self):
+        with self._lock:
+            return {'snapshots': self._snapshots, 'pending_symbols': len(self._pending), 'recorded': self._recorded}
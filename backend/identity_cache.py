@@ -0,0 +1,144 @@
+"""
+Cross-request cache of user identities for the auth decorators.
+
+login_required, admin_required and the handlers behind them only need a
+user's id, email, name, roles and active flag. IdentityCache keeps those as
+an immutable Identity per user id in a small LRU, so a typical authenticated
+request resolves its user without a query; app.py resolves it once per
+request into flask.g on top of this.
+
+Entries expire after a TTL. Writers that change a password, role,
+activation or delete a user call invalidate(), which also touches a stamp
+file so other worker processes drop their copies on their next lookup (see
+credential_vault.touch_stamp).
+"""
+import threading
+import time
+from collections import OrderedDict, namedtuple
+
+from credential_vault import touch_stamp, stamp_mtime
+
+Identity = namedtuple('Identity', ['id', 'email', 'name', 'is_superadmin', 'is_admin', 'is_active'])
+
+
+def identity_of(user):
+    """Snapshot the cached fields of a User row"""
+    return Identity(user.id, user.email, user.name, bool(user.is_superadmin), bool(user.is_admin),
+                    bool(user.is_active))
+
+
+class IdentityCache:
+    """LRU of Identity by user id, with an email index for well-known accounts"""
+
+    def __init__(self, load_by_id, load_by_email, ttl=60.0, max_entries=1024, stamp_path=None):
+        self._load_by_id = load_by_id
+        self._load_by_email = load_by_email
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.stamp_path = stamp_path
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._ids_by_email = {}
+        self._generation = 0
+        self._stamp = stamp_mtime(stamp_path) if stamp_path else None
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._invalidations = 0
+        self._external_invalidations = 0
+
+    def _check_stamp(self):
+        if not self.stamp_path:
+            return
+        stamp = stamp_mtime(self.stamp_path)
+        if stamp != self._stamp:
+            self._stamp = stamp
+            self._clear()
+            self._external_invalidations += 1
+
+    def _clear(self):
+        self._entries.clear()
+        self._ids_by_email.clear()
+        self._generation += 1
+
+    def _lookup(self, user_id, now):
+        entry = self._entries.get(user_id)
+        if entry is None or now - entry[1] >= self.ttl:
+            return None
+        self._entries.move_to_end(user_id)
+        return entry[0]
+
+    def _store(self, identity, now, generation):
+        if identity is None or generation != self._generation:
+            return
+        self._entries[identity.id] = (identity, now)
+        self._entries.move_to_end(identity.id)
+        self._ids_by_email[identity.email] = identity.id
+        while len(self._entries) > self.max_entries:
+            _, (evicted, _) = self._entries.popitem(last=False)
+            self._ids_by_email.pop(evicted.email, None)
+            self._evictions += 1
+
+    def get(self, user_id):
+        """Return the Identity for user_id, or None if no such user exists"""
+        if user_id is None:
+            return None
+        now = time.monotonic()
+        with self._lock:
+            self._check_stamp()
+            identity = self._lookup(user_id, now)
+            if identity is not None:
+                self._hits += 1
+                return identity
+            self._misses += 1
+            generation = self._generation
+        identity = self._load_by_id(user_id)
+        with self._lock:
+            self._store(identity, now, generation)
+        return identity
+
+    def get_by_email(self, email):
+        """Return the Identity for email, or None if no such user exists"""
+        now = time.monotonic()
+        with self._lock:
+            self._check_stamp()
+            user_id = self._ids_by_email.get(email)
+            identity = self._lookup(user_id, now) if user_id is not None else None
+            if identity is not None and identity.email == email:
+                self._hits += 1
+                return identity
+            self._misses += 1
+            generation = self._generation
+        identity = self._load_by_email(email)
+        with self._lock:
+            self._store(identity, now, generation)
+        return identity
+
+    def invalidate(self, user_id=None):
+        """Forget one user (or everyone) here and, via the stamp, in other processes"""
+        with self._lock:
+            if user_id is None:
+                self._clear()
+            else:
+                entry = self._entries.pop(user_id, None)
+                if entry is not None:
+                    self._ids_by_email.pop(entry[0].email, None)
+                self._generation += 1
+            self._invalidations += 1
+            touch_stamp(self.stamp_path)
+            self._stamp = stamp_mtime(self.stamp_path) if self.stamp_path else None
+
+    def stats(self):
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                'ttl_seconds': self.ttl,
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'hits': self._hits,
+                'misses': self._misses,
+                'hit_ratio': round(self._hits / lookups, 4) if lookups else None,
+                'evictions': self._evictions,
+                'invalidations': self._invalidations,
+                'external_invalidations': self._external_invalidations
+            }
@@ -0,0 +1,266 @@
+"""
+Local time-series store for KuCoin futures klines.
+
+1-minute candles live in a WITHOUT ROWID SQLite table keyed by
+(symbol, ts), so a time-range read is a single index range scan. Coarser
+intervals (5m, 15m, 1h, 4h, 1d) are resampled on the fly with NumPy.
+
+KlineIngestor is a background job that keeps the tracked symbols caught up
+from KuCoin's kline endpoint; routes only ever read from the store. The
+tracked set lives in the same file (kline_symbols), so a symbol first
+requested on any worker process is ingested by whichever one holds the job's
+lease, and survives restarts.
+"""
+import logging
+import sqlite3
+import threading
+import time
+
+import numpy as np
+
+MINUTE_MS = 60 * 1000
+
+# Interval name -> bucket size in milliseconds
+INTERVALS = {
+    '1m': MINUTE_MS,
+    '5m': 5 * MINUTE_MS,
+    '15m': 15 * MINUTE_MS,
+    '1h': 60 * MINUTE_MS,
+    '4h': 240 * MINUTE_MS,
+    '1d': 1440 * MINUTE_MS
+}
+
+COLUMNS = ('ts', 'open', 'high', 'low', 'close', 'volume', 'turnover')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS klines (
+    symbol TEXT NOT NULL,
+    ts INTEGER NOT NULL,
+    open REAL NOT NULL,
+    high REAL NOT NULL,
+    low REAL NOT NULL,
+    close REAL NOT NULL,
+    volume REAL NOT NULL,
+    turnover REAL,
+    PRIMARY KEY (symbol, ts)
+) WITHOUT ROWID
+"""
+
+SYMBOLS_SCHEMA = """
+CREATE TABLE IF NOT EXISTS kline_symbols (
+    symbol TEXT PRIMARY KEY,
+    added_at INTEGER NOT NULL
+)
+"""
+
+
+def resample(rows, interval_ms):
+    """Aggregate ascending 1m rows [(ts, o, h, l, c, v, t)] into interval_ms buckets"""
+    if not rows or interval_ms == MINUTE_MS:
+        return rows
+    data = np.array(rows, dtype=np.float64)
+    ts = data[:, 0].astype(np.int64)
+    buckets = ts - ts % interval_ms
+    starts = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+    ends = np.r_[starts[1:], len(data)] - 1
+    turnover = np.nan_to_num(data[:, 6])
+    out = np.column_stack([
+        buckets[starts],
+        data[starts, 1],
+        np.maximum.reduceat(data[:, 2], starts),
+        np.minimum.reduceat(data[:, 3], starts),
+        data[ends, 4],
+        np.add.reduceat(data[:, 5], starts),
+        np.add.reduceat(turnover, starts)
+    ])
+    return [(int(row[0]), *row[1:].tolist()) for row in out]
+
+
+class KlineStore:
+    """SQLite-backed 1m candle store with range reads"""
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._rows_written = 0
+        self._reads = 0
+        with self._connect() as conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute(SCHEMA)
+            existed = conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'kline_symbols'").fetchone()
+            conn.execute(SYMBOLS_SCHEMA)
+            if not existed:
+                # Stores from before the shared tracked set: keep ingesting what they hold
+                conn.execute('INSERT OR IGNORE INTO kline_symbols (symbol, added_at) '
+                             'SELECT DISTINCT symbol, ? FROM klines', (int(time.time() * 1000),))
+
+    def _connect(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10)
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    def write(self, symbol, candles):
+        """Upsert [(ts, open, high, low, close, volume, turnover)] for symbol"""
+        if not candles:
+            return 0
+        with self._connect() as conn:
+            conn.executemany(
+                'INSERT OR REPLACE INTO klines (symbol, ts, open, high, low, close, volume, turnover) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                [(symbol, *candle) for candle in candles]
+            )
+        with self._lock:
+            self._rows_written += len(candles)
+        return len(candles)
+
+    def latest_ts(self, symbol):
+        row = self._connect().execute('SELECT MAX(ts) FROM klines WHERE symbol = ?', (symbol,)).fetchone()
+        return row[0]
+
+    def read(self, symbol, start_ms, end_ms, interval='1m', limit=500):
+        """Return the most recent limit candles of interval in [start_ms, end_ms], oldest first"""
+        interval_ms = INTERVALS[interval]
+        # Align to bucket boundaries so the first and last buckets are complete
+        start_ms -= start_ms % interval_ms
+        if limit:
+            start_ms = max(start_ms, end_ms - end_ms % interval_ms - (limit - 1) * interval_ms)
+        rows = self._connect().execute(
+            'SELECT ts, open, high, low, close, volume, turnover FROM klines '
+            'WHERE symbol = ? AND ts >= ? AND ts <= ? ORDER BY ts',
+            (symbol, start_ms, end_ms)
+        ).fetchall()
+        with self._lock:
+            self._reads += 1
+        candles = resample(rows, interval_ms)
+        return candles[-limit:] if limit else candles
+
+    def symbols(self):
+        return [row[0] for row in self._connect().execute('SELECT DISTINCT symbol FROM klines')]
+
+    def track(self, symbol):
+        """Add symbol to the shared tracked set; returns True if it was new"""
+        with self._connect() as conn:
+            return conn.execute('INSERT OR IGNORE INTO kline_symbols (symbol, added_at) VALUES (?, ?)',
+                                (symbol, int(time.time() * 1000))).rowcount == 1
+
+    def tracked(self):
+        return [row[0] for row in self._connect().execute('SELECT symbol FROM kline_symbols ORDER BY symbol')]
+
+    def stats(self):
+        with self._lock:
+            return {'path': self.path, 'rows_written': self._rows_written, 'reads': self._reads}
+
+
+class KlineIngestor:
+    """Background job keeping tracked symbols' 1m candles current in a KlineStore"""
+
+    def __init__(self, store, fetch, symbols=(), poll_interval=60.0, backfill_hours=24,
+                 page_size=500, logger=None):
+        self.store = store
+        self._fetch = fetch
+        self.poll_interval = poll_interval
+        self.backfill_ms = int(backfill_hours * 3600 * 1000)
+        self.page_size = page_size
+        self._logger = logger or logging.getLogger(__name__)
+        self._lock = threading.Lock()
+        # Symbols this process has seen in the shared set, so repeat track() calls skip the write
+        self._known = set()
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+        self._thread = None
+        self._runs = 0
+        self._fetches = 0
+        self._errors = 0
+        self._candles = 0
+        self._last_run_at = None
+        self._last_error = None
+        for symbol in symbols:
+            self.track(symbol)
+
+    def track(self, symbol):
+        """Add a symbol to the shared ingest set; returns True if it was new"""
+        with self._lock:
+            if symbol in self._known:
+                return False
+        added = self.store.track(symbol)
+        with self._lock:
+            self._known.add(symbol)
+        if added:
+            self._wake.set()
+        return added
+
+    def is_tracked(self, symbol):
+        with self._lock:
+            if symbol in self._known:
+                return True
+        return symbol in self.store.tracked()
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='kucoin-kline-ingest', daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=5):
+        self._stop.set()
+        self._wake.set()
+        if self._thread:
+            self._thread.join(timeout)
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.run_once()
+            self._wake.wait(self.poll_interval)
+            self._wake.clear()
+
+    def run_once(self):
+        """Catch every tracked symbol up to now, including those added by other processes"""
+        symbols = self.store.tracked()
+        with self._lock:
+            self._known.update(symbols)
+        for symbol in symbols:
+            if self._stop.is_set():
+                break
+            try:
+                self.ingest(symbol)
+            except Exception as e:
+                self._errors += 1
+                self._last_error = f'{symbol}: {e}'
+                self._logger.warning(f'Kline ingest for {symbol} failed: {e}')
+        self._runs += 1
+        self._last_run_at = time.time()
+
+    def ingest(self, symbol, now_ms=None):
+        """Fetch candles from the last stored one (re-reading the still-open minute) up to now"""
+        now_ms = now_ms or int(time.time() * 1000)
+        latest = self.store.latest_ts(symbol)
+        start = max(latest if latest is not None else 0, now_ms - self.backfill_ms)
+        written = 0
+        while start <= now_ms:
+            end = min(now_ms, start + (self.page_size - 1) * MINUTE_MS)
+            self._fetches += 1
+            candles = self._fetch(symbol, start, end)
+            written += self.store.write(symbol, candles)
+            start = end + MINUTE_MS
+        self._candles += written
+        return written
+
+    def stats(self):
+        tracked = self.store.tracked()
+        return {
+            'running': bool(self._thread and self._thread.is_alive()),
+            'tracked_symbols': tracked,
+            'runs': self._runs,
+            'fetches': self._fetches,
+            'candles_written': self._candles,
+            'errors': self._errors,
+            'last_error': self._last_error,
+            'last_run_age_seconds': round(time.time() - self._last_run_at, 3) if self._last_run_at else None,
+            'store': self.store.stats()
+        }
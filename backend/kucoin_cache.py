@@ -0,0 +1,182 @@
+"""
+Process-wide caches for KuCoin market data.
+
+A SnapshotCache holds one upstream payload (e.g. the active contracts list)
+for a configurable TTL so every route and every connected client shares the
+same download instead of each hitting the exchange.
+
+Past the TTL it serves stale-while-revalidate: for up to max_stale seconds
+the old value is returned at once while one background thread refreshes it,
+and if a blocking reload fails the last good value is served instead of an
+error. Callers get a CacheEntry carrying the value's age so responses can be
+marked as stale, and an etag that only changes when a reload brings
+different content, for conditional GETs.
+"""
+import logging
+import secrets
+import threading
+import time
+from collections import namedtuple
+
+CacheEntry = namedtuple('CacheEntry', ['value', 'age', 'stale', 'etag'], defaults=[None])
+
+
+class SnapshotCache:
+    """Single-value TTL cache with size accounting and explicit invalidation"""
+
+    def __init__(self, name, ttl, flight=None, max_stale=0.0):
+        self.name = name
+        self.ttl = ttl
+        self.max_stale = max_stale
+        self._flight = flight
+        self._refreshing = False
+        self._listeners = []
+        self._stale_served = 0
+        self._refresh_failures = 0
+        self._lock = threading.Lock()
+        self._value = None
+        # Per-process epoch so a restart never reuses an etag for different data
+        self._epoch = secrets.token_hex(4)
+        self._version = 0
+        self._fetched_at = 0.0
+        self._size_bytes = 0
+        self._hits = 0
+        self._misses = 0
+        self._loads = 0
+        self._invalidations = 0
+
+    def _etag(self):
+        return f'{self.name}-{self._epoch}-{self._version}'
+
+    def _is_fresh(self, now):
+        return self._value is not None and now - self._fetched_at < self.ttl
+
+    def get(self, loader):
+        """Return the cached value, calling loader() -> (value, size_bytes) when stale"""
+        return self.get_entry(loader).value
+
+    def get_entry(self, loader):
+        """Return a CacheEntry, revalidating in the background or falling back to the last good value"""
+        with self._lock:
+            now = time.time()
+            if self._is_fresh(now):
+                self._hits += 1
+                return CacheEntry(self._value, now - self._fetched_at, False, self._etag())
+            self._misses += 1
+            if self._value is not None and now - self._fetched_at < self.ttl + self.max_stale:
+                self._stale_served += 1
+                entry = CacheEntry(self._value, now - self._fetched_at, True, self._etag())
+                start_refresh = not self._refreshing
+                self._refreshing = True
+            else:
+                entry = None
+
+        if entry is not None:
+            if start_refresh:
+                threading.Thread(target=self._refresh, args=(loader,),
+                                 name=f'{self.name}-refresh', daemon=True).start()
+            return entry
+
+        try:
+            value = self._load(loader)
+            with self._lock:
+                return CacheEntry(value, 0.0, False, self._etag())
+        except Exception:
+            with self._lock:
+                self._refresh_failures += 1
+                if self._value is None:
+                    raise
+                # Upstream is failing: the last good snapshot beats an error
+                self._stale_served += 1
+                return CacheEntry(self._value, time.time() - self._fetched_at, True, self._etag())
+
+    def _load(self, loader):
+        def load():
+            value, size_bytes = loader()
+            self.set(value, size_bytes)
+            return value
+
+        if self._flight is None:
+            return load()
+        # Concurrent misses share a single reload; per-symbol caches (funding_rate:XBTUSDTM) share one counter group
+        return self._flight.do(f'cache:{self.name}', load, group=f"cache:{self.name.split(':', 1)[0]}")
+
+    def refresh(self, loader):
+        """Reload now (e.g. from a scheduler) so requests keep hitting a fresh value"""
+        try:
+            return self._load(loader)
+        except Exception:
+            with self._lock:
+                self._refresh_failures += 1
+            raise
+
+    def _refresh(self, loader):
+        try:
+            self._load(loader)
+        except Exception as e:
+            with self._lock:
+                self._refresh_failures += 1
+            logging.getLogger(__name__).warning(f'Background refresh of {self.name} failed: {e}')
+        finally:
+            with self._lock:
+                self._refreshing = False
+
+    def set(self, value, size_bytes=0):
+        with self._lock:
+            if value != self._value:
+                self._version += 1
+            self._value = value
+            self._size_bytes = size_bytes
+            self._fetched_at = time.time()
+            self._loads += 1
+            listeners = list(self._listeners)
+        for listener in listeners:
+            try:
+                listener(value)
+            except Exception:
+                logging.getLogger(__name__).exception(f'{self.name} refresh listener failed')
+
+    def add_listener(self, listener):
+        """Call listener(value) after every successful load, e.g. to update derived indexes"""
+        with self._lock:
+            self._listeners.append(listener)
+
+    def peek(self):
+        """Return the cached value (fresh or not) without loading"""
+        with self._lock:
+            return self._value
+
+    def invalidate(self):
+        with self._lock:
+            self._value = None
+            self._size_bytes = 0
+            self._fetched_at = 0.0
+            self._invalidations += 1
+
+    def age(self):
+        with self._lock:
+            if self._value is None:
+                return None
+            return time.time() - self._fetched_at
+
+    def stats(self):
+        with self._lock:
+            now = time.time()
+            return {
+                'name': self.name,
+                'ttl_seconds': self.ttl,
+                'max_stale_seconds': self.max_stale,
+                'cached': self._value is not None,
+                'version': self._version,
+                'fresh': self._is_fresh(now),
+                'age_seconds': round(now - self._fetched_at, 3) if self._value is not None else None,
+                'entries': len(self._value) if self._value is not None else 0,
+                'size_bytes': self._size_bytes,
+                'hits': self._hits,
+                'misses': self._misses,
+                'loads': self._loads,
+                'stale_served': self._stale_served,
+                'refresh_failures': self._refresh_failures,
+                'refreshing': self._refreshing,
+                'invalidations': self._invalidations
+            }
@@ -0,0 +1,228 @@
+"""
+Pooled HTTP client for the KuCoin Futures REST API.
+
+One KucoinClient owns a keep-alive requests.Session so repeated polls reuse
+the same TCP+TLS connections. Public market-data calls carry no credentials,
+so their results are safe to coalesce and cache across users. It also owns
+per-endpoint timeouts, header construction and response decoding, so routes
+only deal with decoded data or a KucoinAPIError.
+"""
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from singleflight import SingleFlight
+from kucoin_ratelimit import INTERACTIVE, BACKGROUND, RateLimitExceeded, parse_retry_after
+
+KUCOIN_FUTURES_URL = 'https://api-futures.kucoin.com'
+
+# (connect, read) timeouts in seconds per endpoint group
+DEFAULT_TIMEOUTS = {
+    'contracts_active': (3.05, 10),
+    'contract': (3.05, 5),
+    'funding_rate': (3.05, 5),
+    'bullet': (3.05, 5),
+    'kline': (3.05, 10),
+    'timestamp': (3.05, 5),
+    'private': (3.05, 10),
+    'default': (3.05, 10)
+}
+
+
+class KucoinAPIError(Exception):
+    """Raised when KuCoin answers with a non-200 status or an unexpected body"""
+    def __init__(self, message, status=500, body=None):
+        super().__init__(message)
+        self.status = status
+        self.body = body
+
+
+class KucoinClient:
+    """Keep-alive KuCoin Futures client with pool statistics"""
+
+    def __init__(self, base_url=KUCOIN_FUTURES_URL, pool_size=10, timeouts=None, flight=None,
+                 limiter=None, rate_limit_wait=2.0, max_429_retries=1, breaker=None):
+        self.base_url = base_url
+        self.breaker = breaker
+        self.flight = flight or SingleFlight()
+        self.limiter = limiter
+        self.rate_limit_wait = rate_limit_wait
+        self.max_429_retries = max_429_retries
+        self.timeouts = dict(DEFAULT_TIMEOUTS, **(timeouts or {}))
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=2, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self._adapter = adapter
+        self._lock = threading.Lock()
+        self._requests = 0
+        self._errors = 0
+        self._bytes_received = 0
+        self._total_latency = 0.0
+        self._by_endpoint = {}
+
+    @staticmethod
+    def build_headers(extra=None):
+        """Build request headers; private calls pass their signed KC-API-* headers as extra"""
+        headers = {'Accept': 'application/json'}
+        if extra:
+            headers.update(extra)
+        return headers
+
+    def _record(self, endpoint, elapsed, size, failed):
+        with self._lock:
+            self._requests += 1
+            self._total_latency += elapsed
+            self._bytes_received += size
+            if failed:
+                self._errors += 1
+            counts = self._by_endpoint.setdefault(endpoint, {'requests': 0, 'errors': 0})
+            counts['requests'] += 1
+            if failed:
+                counts['errors'] += 1
+
+    def request(self, method, path, endpoint='default', params=None, priority=INTERACTIVE, headers=None, data=None):
+        """Perform a request and return (data, response_size_bytes)"""
+        timeout = self.timeouts.get(endpoint, self.timeouts['default'])
+        bucket = self.limiter.bucket(endpoint) if self.limiter else None
+        started = time.perf_counter()
+        if self.breaker and not self.breaker.allow():
+            self._record(endpoint, 0.0, 0, True)
+            raise KucoinAPIError(f'KuCoin unavailable, retry in {self.breaker.retry_after():.1f}s (circuit open)', 503)
+        attempt = 0
+        while True:
+            if bucket:
+                try:
+                    bucket.acquire(priority, self.rate_limit_wait)
+                except RateLimitExceeded as e:
+                    self._record(endpoint, time.perf_counter() - started, 0, True)
+                    if self.breaker:
+                        self.breaker.release()
+                    raise KucoinAPIError(str(e), 429) from e
+            try:
+                response = self.session.request(method, f'{self.base_url}{path}', params=params, data=data,
+                                                headers=self.build_headers(headers), timeout=timeout)
+            except requests.RequestException as e:
+                self._record(endpoint, time.perf_counter() - started, 0, True)
+                if self.breaker:
+                    self.breaker.record_failure()
+                raise KucoinAPIError(f'KuCoin request failed: {e}', 502) from e
+
+            if bucket:
+                bucket.observe(response.headers)
+                if response.status_code == 429:
+                    bucket.throttle(parse_retry_after(response.headers))
+                    if attempt < self.max_429_retries:
+                        # The next acquire() waits out the backoff if it fits the wait budget
+                        attempt += 1
+                        continue
+                else:
+                    bucket.success()
+            break
+
+        size = len(response.content)
+        if self.breaker:
+            # Only server-side trouble counts against the circuit; 4xx is the caller's problem
+            if response.status_code >= 500:
+                self.breaker.record_failure()
+            else:
+                self.breaker.record_success()
+        if response.status_code != 200:
+            self._record(endpoint, time.perf_counter() - started, size, True)
+            raise KucoinAPIError('KuCoin request failed', response.status_code, response.text)
+
+        try:
+            payload = response.json()
+        except ValueError:
+            payload = None
+        if not isinstance(payload, dict) or 'data' not in payload:
+            self._record(endpoint, time.perf_counter() - started, size, True)
+            raise KucoinAPIError('Unexpected KuCoin response', 500, response.text)
+
+        self._record(endpoint, time.perf_counter() - started, size, False)
+        return payload['data'], size
+
+    def get(self, path, endpoint='default', params=None, priority=INTERACTIVE):
+        """Public GET with single-flight: concurrent identical market-data reads share one upstream call"""
+        key = f'GET {path}'
+        if params:
+            key += '?' + '&'.join(f'{name}={value}' for name, value in sorted(params.items()))
+        return self.flight.do(key, lambda: self.request('GET', path, endpoint, params=params, priority=priority),
+                              group=endpoint)
+
+    # Public market data: no credentials, so results can be cached and shared by every user
+
+    def get_active_contracts(self, priority=INTERACTIVE):
+        return self.get('/api/v1/contracts/active', 'contracts_active', priority=priority)
+
+    def get_contract(self, symbol, priority=INTERACTIVE):
+        data, _ = self.get(f'/api/v1/contracts/{symbol}', 'contract', priority=priority)
+        return data
+
+    def get_funding_rate(self, symbol, priority=INTERACTIVE):
+        data, _ = self.get(f'/api/v1/contracts/{symbol}/funding-rate', 'funding_rate', priority=priority)
+        return data
+
+    def get_klines(self, symbol, start_ms, end_ms, granularity=1, priority=BACKGROUND):
+        """Candles as [(ts, open, high, low, close, volume, turnover)], oldest first"""
+        params = {'symbol': symbol, 'granularity': granularity, 'from': start_ms, 'to': end_ms}
+        data, _ = self.get('/api/v1/kline/query', 'kline', params=params, priority=priority)
+        candles = []
+        for row in data or []:
+            ts, open_, high, low, close, volume = row[:6]
+            turnover = row[6] if len(row) > 6 else None
+            candles.append((int(ts), float(open_), float(high), float(low), float(close), float(volume),
+                            float(turnover) if turnover is not None else None))
+        candles.sort()
+        return candles
+
+    def get_server_time(self):
+        """KuCoin server time in milliseconds"""
+        data, _ = self.request('GET', '/api/v1/timestamp', 'timestamp', priority=BACKGROUND)
+        return data
+
+    def get_public_bullet(self):
+        """Request a public WebSocket token: returns (endpoint, token, ping_interval_seconds)"""
+        data, _ = self.request('POST', '/api/v1/bullet-public', 'bullet', priority=BACKGROUND)
+        server = data['instanceServers'][0]
+        return server['endpoint'], data['token'], server.get('pingInterval', 18000) / 1000
+
+    def pool_stats(self):
+        """Connection reuse figures from the underlying urllib3 pools"""
+        pools = []
+        manager = self._adapter.poolmanager
+        for key in list(manager.pools.keys()):
+            pool = manager.pools.get(key)
+            if pool is None:
+                continue
+            pools.append({
+                'host': pool.host,
+                'connections_opened': pool.num_connections,
+                'requests': pool.num_requests,
+                'free_slots': pool.pool.qsize() if pool.pool is not None else 0,
+                'max_size': pool.pool.maxsize if pool.pool is not None else 0
+            })
+        opened = sum(p['connections_opened'] for p in pools)
+        served = sum(p['requests'] for p in pools)
+        return {
+            'pools': pools,
+            'connections_opened': opened,
+            'requests': served,
+            'reuse_ratio': round(1 - opened / served, 3) if served else None
+        }
+
+    def stats(self):
+        with self._lock:
+            stats = {
+                'requests': self._requests,
+                'errors': self._errors,
+                'bytes_received': self._bytes_received,
+                'avg_latency_ms': round(self._total_latency / self._requests * 1000, 2) if self._requests else None,
+                'by_endpoint': {name: dict(counts) for name, counts in self._by_endpoint.items()}
+            }
+        stats['pool'] = self.pool_stats()
+        if self.breaker:
+            stats['circuit'] = self.breaker.stats()
+        return stats
@@ -0,0 +1,151 @@
+"""
+Signed access to private KuCoin Futures endpoints.
+
+KucoinSigner builds the KC-API-* headers for one API key. The HMAC-SHA256
+key schedule is computed once and copied per request, and the (v2) signed
+passphrase is computed once, so signing costs a single HMAC update over the
+short prehash string. Callers keep one signer per key alongside its
+decrypted credentials (CredentialVault.get_derived), so it is dropped
+whenever the key is changed or deleted.
+
+ServerClock keeps the offset between our clock and KuCoin's
+(/api/v1/timestamp) so request timestamps stay inside KuCoin's acceptance
+window even when the host clock drifts. It resyncs when the offset is older
+than sync_interval; only one thread does the sync while the others keep
+using the previous offset.
+"""
+import base64
+import hashlib
+import hmac
+import json
+import threading
+import time
+from urllib.parse import urlencode
+
+from kucoin_ratelimit import INTERACTIVE
+
+
+class IncompleteCredentials(Exception):
+    """A stored key lacks a part that signing needs"""
+
+    def __init__(self, missing):
+        super().__init__(f"API key has no {' or '.join(missing)}")
+        self.missing = missing
+
+
+class KucoinSigner:
+    """Precomputed HMAC state for one (key, secret, passphrase)"""
+
+    def __init__(self, key, secret, passphrase, key_version='2'):
+        missing = [name for name, value in (('key', key), ('secret', secret), ('passphrase', passphrase)) if not value]
+        if missing:
+            raise IncompleteCredentials(missing)
+        self.key = key
+        self.key_version = key_version
+        self._mac = hmac.new(secret.encode('utf-8'), digestmod=hashlib.sha256)
+        if key_version == '1':
+            self._passphrase = passphrase
+        else:
+            self._passphrase = self._sign(passphrase.encode('utf-8'))
+
+    def _sign(self, message):
+        mac = self._mac.copy()
+        mac.update(message)
+        return base64.b64encode(mac.digest()).decode('ascii')
+
+    def headers(self, timestamp_ms, method, endpoint, body=''):
+        """KC-API-* headers for one request; endpoint includes the query string"""
+        timestamp = str(timestamp_ms)
+        return {
+            'KC-API-KEY': self.key,
+            'KC-API-SIGN': self._sign(f'{timestamp}{method.upper()}{endpoint}{body}'.encode('utf-8')),
+            'KC-API-TIMESTAMP': timestamp,
+            'KC-API-PASSPHRASE': self._passphrase,
+            'KC-API-KEY-VERSION': self.key_version
+        }
+
+
+class ServerClock:
+    """Local clock corrected by KuCoin's server time"""
+
+    def __init__(self, fetch_server_time, sync_interval=300.0):
+        self._fetch = fetch_server_time
+        self.sync_interval = sync_interval
+        self._lock = threading.Lock()
+        self._syncing = False
+        self._offset_ms = 0
+        self._synced_at = None
+        self._round_trip_ms = None
+        self._syncs = 0
+        self._failures = 0
+        self._last_error = None
+
+    def sync(self):
+        """Measure the offset now; the server time is matched to the request midpoint"""
+        started = time.time()
+        server_ms = int(self._fetch())
+        finished = time.time()
+        midpoint_ms = (started + finished) * 500
+        with self._lock:
+            self._offset_ms = int(server_ms - midpoint_ms)
+            self._round_trip_ms = round((finished - started) * 1000, 3)
+            self._synced_at = finished
+            self._syncs += 1
+        return self._offset_ms
+
+    def _maybe_sync(self):
+        with self._lock:
+            due = self._synced_at is None or time.time() - self._synced_at >= self.sync_interval
+            if not due or self._syncing:
+                return
+            self._syncing = True
+        try:
+            self.sync()
+        except Exception as e:
+            with self._lock:
+                self._failures += 1
+                self._last_error = str(e)
+        finally:
+            with self._lock:
+                self._syncing = False
+
+    def now_ms(self):
+        self._maybe_sync()
+        return int(time.time() * 1000) + self._offset_ms
+
+    def stats(self):
+        with self._lock:
+            return {
+                'offset_ms': self._offset_ms,
+                'round_trip_ms': self._round_trip_ms,
+                'synced_age_seconds': round(time.time() - self._synced_at, 3) if self._synced_at else None,
+                'sync_interval_seconds': self.sync_interval,
+                'syncs': self._syncs,
+                'failures': self._failures,
+                'last_error': self._last_error
+            }
+
+
+class KucoinPrivateClient:
+    """Signed requests over a KucoinClient's pooled session, rate limiter and breaker"""
+
+    def __init__(self, client, clock):
+        self.client = client
+        self.clock = clock
+
+    def request(self, signer, method, path, endpoint='private', params=None, body=None, priority=INTERACTIVE):
+        # Sign exactly the query string and body that go on the wire
+        if params:
+            path = f'{path}?{urlencode(sorted(params.items()))}'
+        payload = json.dumps(body, separators=(',', ':')) if body is not None else ''
+        headers = signer.headers(self.clock.now_ms(), method, path, payload)
+        if payload:
+            headers['Content-Type'] = 'application/json'
+        data, _ = self.client.request(method, path, endpoint, headers=headers, data=payload or None, priority=priority)
+        return data
+
+    def get_account_overview(self, signer, currency='USDT'):
+        return self.request(signer, 'GET', '/api/v1/account-overview', 'private', params={'currency': currency})
+
+    def get_positions(self, signer):
+        return self.request(signer, 'GET', '/api/v1/positions', 'private')
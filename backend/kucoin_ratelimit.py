@@ -0,0 +1,172 @@
+"""
+Outbound rate limiting for KuCoin requests.
+
+Each endpoint group (KuCoin meters public and private traffic separately)
+gets a token bucket. The bucket is corrected from the exchange's
+gw-ratelimit-* response headers, and a 429 (or a Retry-After header) blocks
+the whole group for the advertised time plus jittered exponential backoff.
+
+Interactive requests may spend the whole bucket; background refreshes stop
+at a reserve so they can never starve a user-facing route.
+"""
+import random
+import threading
+import time
+
+INTERACTIVE = 'interactive'
+BACKGROUND = 'background'
+
+
+class RateLimitExceeded(Exception):
+    """Raised when no token becomes available within the caller's wait budget"""
+    def __init__(self, group, retry_after):
+        super().__init__(f'KuCoin {group} rate limit reached, retry in {retry_after:.1f}s')
+        self.group = group
+        self.retry_after = retry_after
+
+
+class TokenBucket:
+    """Token bucket with a reserve that only interactive callers may use"""
+
+    def __init__(self, name, rate, capacity, reserve_fraction=0.2):
+        self.name = name
+        self.rate = rate
+        self.capacity = capacity
+        self.reserve = capacity * reserve_fraction
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._blocked_until = 0.0
+        self._consecutive_429 = 0
+        self._cond = threading.Condition()
+        self.acquired = {INTERACTIVE: 0, BACKGROUND: 0}
+        self.rejected = {INTERACTIVE: 0, BACKGROUND: 0}
+        self.waited_seconds = 0.0
+        self.throttled = 0
+        self.upstream_limit = None
+        self.upstream_remaining = None
+
+    def _refill(self, now):
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def _wait_time(self, now, priority):
+        """Seconds until a token is available for priority (0 if available now)"""
+        if now < self._blocked_until:
+            return self._blocked_until - now
+        floor = 0.0 if priority == INTERACTIVE else self.reserve
+        if self._tokens - 1 >= floor:
+            return 0.0
+        return (floor + 1 - self._tokens) / self.rate
+
+    def acquire(self, priority=INTERACTIVE, timeout=5.0):
+        started = time.monotonic()
+        deadline = started + timeout
+        with self._cond:
+            while True:
+                now = time.monotonic()
+                self._refill(now)
+                wait = self._wait_time(now, priority)
+                if wait == 0.0:
+                    self._tokens -= 1
+                    self.acquired[priority] += 1
+                    self.waited_seconds += now - started
+                    return
+                if now + wait > deadline:
+                    self.rejected[priority] += 1
+                    raise RateLimitExceeded(self.name, wait)
+                self._cond.wait(wait)
+
+    def observe(self, headers):
+        """Align the bucket with KuCoin's gw-ratelimit-* headers"""
+        limit = headers.get('gw-ratelimit-limit')
+        remaining = headers.get('gw-ratelimit-remaining')
+        reset_ms = headers.get('gw-ratelimit-reset')
+        if remaining is None:
+            return
+        with self._cond:
+            try:
+                self.upstream_limit = int(limit) if limit is not None else None
+                self.upstream_remaining = int(remaining)
+            except ValueError:
+                return
+            self._refill(time.monotonic())
+            # Never believe we have more budget than the exchange says we do
+            self._tokens = min(self._tokens, float(self.upstream_remaining))
+            if self.upstream_remaining <= 0 and reset_ms is not None:
+                try:
+                    self._block(int(reset_ms) / 1000)
+                except ValueError:
+                    pass
+
+    def throttle(self, retry_after=None):
+        """Handle a 429: block the group for Retry-After, or a jittered exponential backoff"""
+        with self._cond:
+            self.throttled += 1
+            self._consecutive_429 += 1
+            backoff = min(30.0, 0.5 * 2 ** (self._consecutive_429 - 1))
+            delay = max(retry_after or 0.0, backoff)
+            delay = delay * random.uniform(1.0, 1.5)
+            self._block(delay)
+            self._tokens = 0.0
+            return delay
+
+    def success(self):
+        with self._cond:
+            self._consecutive_429 = 0
+
+    def _block(self, seconds):
+        self._blocked_until = max(self._blocked_until, time.monotonic() + seconds)
+        self._cond.notify_all()
+
+    def stats(self):
+        with self._cond:
+            now = time.monotonic()
+            self._refill(now)
+            return {
+                'rate_per_second': self.rate,
+                'capacity': self.capacity,
+                'reserve': self.reserve,
+                'tokens': round(self._tokens, 2),
+                'blocked_for_seconds': round(max(0.0, self._blocked_until - now), 3),
+                'acquired': dict(self.acquired),
+                'rejected': dict(self.rejected),
+                'waited_seconds': round(self.waited_seconds, 3),
+                'throttled_429': self.throttled,
+                'upstream_limit': self.upstream_limit,
+                'upstream_remaining': self.upstream_remaining
+            }
+
+
+class KucoinRateLimiter:
+    """Token buckets per KuCoin endpoint group"""
+
+    def __init__(self, groups, endpoint_groups, default_group='public'):
+        self._buckets = {name: TokenBucket(name, rate, capacity) for name, (rate, capacity) in groups.items()}
+        self._endpoint_groups = endpoint_groups
+        self._default_group = default_group
+
+    def bucket(self, endpoint):
+        return self._buckets[self._endpoint_groups.get(endpoint, self._default_group)]
+
+    def acquire(self, endpoint, priority=INTERACTIVE, timeout=5.0):
+        self.bucket(endpoint).acquire(priority, timeout)
+
+    def stats(self):
+        return {name: bucket.stats() for name, bucket in self._buckets.items()}
+
+
+def parse_retry_after(headers):
+    """Seconds to wait from Retry-After or gw-ratelimit-reset (milliseconds), if present"""
+    retry_after = headers.get('Retry-After')
+    if retry_after is not None:
+        try:
+            return float(retry_after)
+        except ValueError:
+            pass
+    reset_ms = headers.get('gw-ratelimit-reset')
+    if reset_ms is not None:
+        try:
+            return int(reset_ms) / 1000
+        except ValueError:
+            pass
+    return None
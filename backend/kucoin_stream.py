@@ -0,0 +1,298 @@
+"""
+Streaming market-data ingest from the KuCoin Futures WebSocket feed.
+
+KucoinMarketStream subscribes to the ticker and instrument (mark/index price,
+funding) topics and patches a MarketStateStore, so price routes can answer
+from memory instead of proxying every poll to the exchange.
+
+The socket itself is a pluggable transport: anything with connect(url),
+send(text), recv(timeout) -> str | None and close() works, which lets the
+ingest loop run against a local stand-in server.
+"""
+import itertools
+import json
+import logging
+import threading
+import time
+import uuid
+
+TICKER_TOPIC = '/contractMarket/ticker'
+INSTRUMENT_TOPIC = '/contract/instrument'
+
+# KuCoin accepts at most 100 symbols per subscribe message
+SUBSCRIBE_BATCH = 100
+
+# Rolling 24h statistics that neither topic carries; they only change when a
+# REST/snapshot payload is merged in
+SNAPSHOT_FIELDS = ('highPrice', 'lowPrice', 'volumeOf24h', 'turnoverOf24h', 'openInterest', 'priceChg', 'priceChgPct')
+
+
+class MarketStateStore:
+    """Latest contract-shaped state per symbol, patched in place by stream updates"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._states = {}
+        self._updated_at = {}
+        self._snapshot_at = {}
+        self._listeners = []
+
+    def seed(self, symbol, contract):
+        """Replace the state for symbol with a full contract payload (e.g. from REST)"""
+        self._publish(symbol, dict(contract), replace=True, snapshot=True)
+
+    def merge_snapshot(self, symbol, contract):
+        """Refresh the 24h statistics from a snapshot without rolling back streamed prices"""
+        fields = {field: contract[field] for field in SNAPSHOT_FIELDS if field in contract}
+        with self._lock:
+            state = self._states.get(symbol)
+            if state is not None and all(state.get(field) == value for field, value in fields.items()):
+                # Nothing changed: confirm freshness without waking listeners
+                self._snapshot_at[symbol] = time.time()
+                return
+        self._publish(symbol, fields, replace=False, snapshot=True)
+
+    def update(self, symbol, fields):
+        """Merge stream fields into the state for symbol"""
+        self._publish(symbol, fields, replace=False)
+
+    def _publish(self, symbol, fields, replace, snapshot=False):
+        with self._lock:
+            if replace:
+                state = fields
+            else:
+                # Copy-on-write so readers never see a half-applied update
+                state = dict(self._states.get(symbol) or {'symbol': symbol})
+                state.update(fields)
+            self._states[symbol] = state
+            self._updated_at[symbol] = time.time()
+            if snapshot:
+                self._snapshot_at[symbol] = self._updated_at[symbol]
+            listeners = list(self._listeners)
+        for listener in listeners:
+            try:
+                listener(symbol, state)
+            except Exception:
+                logging.getLogger(__name__).exception('Market state listener failed')
+
+    def get(self, symbol, max_age=None, snapshot_max_age=None):
+        """Return the latest state for symbol, or None if missing, older than max_age seconds,
+        or if its 24h statistics are older than snapshot_max_age seconds"""
+        with self._lock:
+            state = self._states.get(symbol)
+            if state is None:
+                return None
+            now = time.time()
+            if max_age is not None and now - self._updated_at[symbol] > max_age:
+                return None
+            if snapshot_max_age is not None and now - self._snapshot_at.get(symbol, 0) > snapshot_max_age:
+                return None
+            return state
+
+    def age(self, symbol):
+        with self._lock:
+            updated_at = self._updated_at.get(symbol)
+        return None if updated_at is None else time.time() - updated_at
+
+    def symbols(self):
+        with self._lock:
+            return list(self._states)
+
+    def add_listener(self, listener):
+        with self._lock:
+            self._listeners.append(listener)
+
+    def remove_listener(self, listener):
+        with self._lock:
+            if listener in self._listeners:
+                self._listeners.remove(listener)
+
+    def stats(self):
+        with self._lock:
+            now = time.time()
+            ages = [now - updated for updated in self._updated_at.values()]
+            return {
+                'symbols': len(self._states),
+                'listeners': len(self._listeners),
+                'oldest_age_seconds': round(max(ages), 3) if ages else None,
+                'newest_age_seconds': round(min(ages), 3) if ages else None
+            }
+
+
+class WebSocketClientTransport:
+    """Default transport backed by the websocket-client package"""
+
+    def __init__(self):
+        self._ws = None
+
+    def connect(self, url, timeout=10):
+        import websocket
+        self._ws = websocket.create_connection(url, timeout=timeout)
+
+    def send(self, text):
+        self._ws.send(text)
+
+    def recv(self, timeout):
+        import websocket
+        self._ws.settimeout(timeout)
+        try:
+            return self._ws.recv()
+        except websocket.WebSocketTimeoutException:
+            return None
+
+    def close(self):
+        if self._ws is not None:
+            self._ws.close()
+            self._ws = None
+
+
+class KucoinMarketStream:
+    """Background ingest of KuCoin ticker and mark-price topics into a MarketStateStore"""
+
+    def __init__(self, store, bullet_provider, transport_factory=WebSocketClientTransport,
+                 logger=None, reconnect_delay=1.0, max_reconnect_delay=30.0):
+        self.store = store
+        self._bullet_provider = bullet_provider
+        self._transport_factory = transport_factory
+        self._logger = logger or logging.getLogger(__name__)
+        self._reconnect_delay = reconnect_delay
+        self._max_reconnect_delay = max_reconnect_delay
+        self._lock = threading.Lock()
+        self._symbols = set()
+        self._pending = set()
+        self._ids = itertools.count(1)
+        self._stop = threading.Event()
+        self._thread = None
+        self._connected = False
+        self._messages = 0
+        self._reconnects = 0
+        self._last_message_at = None
+        self._last_error = None
+
+    def subscribe(self, symbols):
+        """Add symbols to the subscription set; new ones are subscribed on the next loop turn"""
+        with self._lock:
+            new = set(symbols) - self._symbols
+            self._symbols |= new
+            self._pending |= new
+
+    def is_subscribed(self, symbol):
+        with self._lock:
+            return symbol in self._symbols
+
+    @property
+    def connected(self):
+        return self._connected
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='kucoin-market-stream', daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=5):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout)
+
+    def _run(self):
+        delay = self._reconnect_delay
+        while not self._stop.is_set():
+            try:
+                self._session()
+                delay = self._reconnect_delay
+            except Exception as e:
+                self._last_error = str(e)
+                self._logger.warning(f'KuCoin stream disconnected: {e}')
+            finally:
+                self._connected = False
+            if self._stop.wait(delay):
+                break
+            self._reconnects += 1
+            delay = min(delay * 2, self._max_reconnect_delay)
+
+    def _session(self):
+        endpoint, token, ping_interval = self._bullet_provider()
+        transport = self._transport_factory()
+        transport.connect(f'{endpoint}?token={token}&connectId={uuid.uuid4().hex}')
+        try:
+            with self._lock:
+                # Everything must be resubscribed on a fresh connection
+                self._pending = set(self._symbols)
+            next_ping = time.time() + ping_interval
+            while not self._stop.is_set():
+                if self._connected:
+                    self._flush_subscriptions(transport)
+                if time.time() >= next_ping:
+                    transport.send(json.dumps({'id': str(next(self._ids)), 'type': 'ping'}))
+                    next_ping = time.time() + ping_interval
+                raw = transport.recv(timeout=min(1.0, ping_interval))
+                if raw is None:
+                    continue
+                self._handle(json.loads(raw))
+        finally:
+            transport.close()
+
+    def _flush_subscriptions(self, transport):
+        with self._lock:
+            pending = sorted(self._pending)
+            self._pending.clear()
+        for i in range(0, len(pending), SUBSCRIBE_BATCH):
+            batch = ','.join(pending[i:i + SUBSCRIBE_BATCH])
+            for topic in (TICKER_TOPIC, INSTRUMENT_TOPIC):
+                transport.send(json.dumps({
+                    'id': str(next(self._ids)),
+                    'type': 'subscribe',
+                    'topic': f'{topic}:{batch}',
+                    'privateChannel': False,
+                    'response': True
+                }))
+
+    def _handle(self, message):
+        kind = message.get('type')
+        if kind == 'welcome':
+            self._connected = True
+            return
+        if kind == 'error':
+            self._last_error = message.get('data')
+            self._logger.warning(f'KuCoin stream error: {message}')
+            return
+        if kind != 'message':
+            return
+
+        self._messages += 1
+        self._last_message_at = time.time()
+        topic = message.get('topic', '')
+        data = message.get('data') or {}
+        symbol = topic.split(':', 1)[-1]
+
+        if topic.startswith(TICKER_TOPIC):
+            fields = {'lastTradePrice': data.get('price'), 'timestamp': data.get('ts')}
+            if 'bestBidPrice' in data:
+                fields['bestBidPrice'] = data['bestBidPrice']
+                fields['bestAskPrice'] = data.get('bestAskPrice')
+            self.store.update(data.get('symbol', symbol), fields)
+        elif topic.startswith(INSTRUMENT_TOPIC):
+            subject = message.get('subject')
+            if subject == 'mark.index.price':
+                self.store.update(symbol, {'markPrice': data.get('markPrice'),
+                                           'indexPrice': data.get('indexPrice')})
+            elif subject == 'funding.rate':
+                self.store.update(symbol, {'fundingFeeRate': data.get('fundingRate')})
+
+    def stats(self):
+        with self._lock:
+            subscribed = len(self._symbols)
+            pending = len(self._pending)
+        return {
+            'running': bool(self._thread and self._thread.is_alive()),
+            'connected': self._connected,
+            'subscribed_symbols': subscribed,
+            'pending_subscriptions': pending,
+            'messages': self._messages,
+            'reconnects': self._reconnects,
+            'last_message_age_seconds': round(time.time() - self._last_message_at, 3) if self._last_message_at else None,
+            'last_error': self._last_error,
+            'store': self.store.stats()
+        }
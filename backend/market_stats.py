@@ -0,0 +1,203 @@
+"""
+Incremental market statistics over the KuCoin contract universe.
+
+MarketStatsEngine keeps running totals (24h volume, turnover, open interest)
+and bounded top-K / bottom-K rankings per metric. Contract snapshots and
+streamed ticker/funding updates are applied as per-symbol deltas, so reading
+the stats costs O(K) instead of re-summing and re-sorting every contract.
+"""
+import heapq
+import math
+import threading
+
+# Ranking metric -> function(contract, open_price) -> float
+METRICS = {
+    'price_change': lambda contract, open_price: _change_pct(contract, open_price),
+    'volume': lambda contract, open_price: _num(contract.get('volumeOf24h')),
+    'turnover': lambda contract, open_price: _num(contract.get('turnoverOf24h')),
+    'open_interest': lambda contract, open_price: _num(contract.get('openInterest')),
+    'funding': lambda contract, open_price: _num(contract.get('fundingFeeRate'))
+}
+
+TOTALS = {
+    'total_volume_24h': 'volume',
+    'total_turnover_24h': 'turnover',
+    'total_open_interest': 'open_interest'
+}
+
+
+def _num(value):
+    try:
+        result = float(value)
+    except (TypeError, ValueError):
+        return 0.0
+    return result if math.isfinite(result) else 0.0
+
+
+def _change_pct(contract, open_price):
+    # Streamed tickers only move the last price; derive the 24h change from
+    # the snapshot's opening price when we have one
+    last = contract.get('lastTradePrice')
+    if open_price and last is not None:
+        return _num(last) / open_price - 1
+    return _num(contract.get('priceChgPct'))
+
+
+def _open_price(contract):
+    last = _num(contract.get('lastTradePrice'))
+    change = _num(contract.get('priceChg'))
+    open_price = last - change
+    return open_price if open_price > 0 else None
+
+
+class TopK:
+    """Best k symbols by value, maintained incrementally.
+
+    Improvements are applied in O(k). When a member gets worse or leaves,
+    an outsider might now belong in the set, so the set is marked dirty and
+    rebuilt with a heap over all values on the next read.
+    """
+
+    def __init__(self, k, values, largest=True):
+        self.k = k
+        self._values = values
+        self._largest = largest
+        self._members = {}
+        self._dirty = True
+        self.rebuilds = 0
+
+    def _better(self, a, b):
+        return a > b if self._largest else a < b
+
+    def _worst(self):
+        pick = min if self._largest else max
+        return pick(self._members.items(), key=lambda item: item[1])
+
+    def update(self, symbol, value):
+        if self._dirty:
+            return
+        if symbol in self._members:
+            old = self._members[symbol]
+            self._members[symbol] = value
+            if self._better(old, value) and len(self._values) > len(self._members):
+                self._dirty = True
+        elif len(self._members) < self.k:
+            self._members[symbol] = value
+        else:
+            worst_symbol, worst_value = self._worst()
+            if self._better(value, worst_value):
+                del self._members[worst_symbol]
+                self._members[symbol] = value
+
+    def remove(self, symbol):
+        if symbol in self._members:
+            self._dirty = True
+
+    def items(self, limit=None):
+        if self._dirty:
+            select = heapq.nlargest if self._largest else heapq.nsmallest
+            self._members = dict(select(self.k, self._values.items(), key=lambda item: item[1]))
+            self._dirty = False
+            self.rebuilds += 1
+        ordered = sorted(self._members.items(), key=lambda item: item[1], reverse=self._largest)
+        return ordered[:limit] if limit else ordered
+
+
+class MarketStatsEngine:
+    """Running totals and top/bottom-K rankings for every metric in METRICS"""
+
+    def __init__(self, k=20):
+        self.k = k
+        self._lock = threading.Lock()
+        self._contracts = {}
+        self._open_prices = {}
+        self._values = {metric: {} for metric in METRICS}
+        self._totals = {metric: 0.0 for metric in TOTALS.values()}
+        self._top = {metric: TopK(k, self._values[metric], largest=True) for metric in METRICS}
+        self._bottom = {metric: TopK(k, self._values[metric], largest=False) for metric in METRICS}
+        self.updates = 0
+
+    def _set(self, symbol, contract):
+        changed = self._contracts.get(symbol) != contract
+        self._contracts[symbol] = contract
+        open_price = self._open_prices.get(symbol)
+        for metric, extract in METRICS.items():
+            value = extract(contract, open_price)
+            values = self._values[metric]
+            old = values.get(symbol)
+            if old == value:
+                continue
+            values[symbol] = value
+            if metric in self._totals:
+                self._totals[metric] += value - (old or 0.0)
+            self._top[metric].update(symbol, value)
+            self._bottom[metric].update(symbol, value)
+        if changed:
+            self.updates += 1
+
+    def _remove(self, symbol):
+        self._contracts.pop(symbol, None)
+        self._open_prices.pop(symbol, None)
+        for metric, values in self._values.items():
+            old = values.pop(symbol, None)
+            if old is not None and metric in self._totals:
+                self._totals[metric] -= old
+            self._top[metric].remove(symbol)
+            self._bottom[metric].remove(symbol)
+
+    def apply_contracts(self, contracts):
+        """Apply a full contracts snapshot (once per refresh, not per request)"""
+        with self._lock:
+            seen = set()
+            for contract in contracts:
+                symbol = contract.get('symbol')
+                if not symbol:
+                    continue
+                seen.add(symbol)
+                if self._contracts.get(symbol) is contract:
+                    continue
+                self._open_prices[symbol] = _open_price(contract)
+                self._set(symbol, contract)
+            for symbol in [symbol for symbol in self._contracts if symbol not in seen]:
+                self._remove(symbol)
+
+    def apply_update(self, symbol, contract):
+        """Apply a streamed state update for a symbol already known from a snapshot"""
+        with self._lock:
+            known = self._contracts.get(symbol)
+            if known is not None:
+                # Stream states may be partial; keep snapshot fields they lack
+                self._set(symbol, {**known, **{key: value for key, value in contract.items() if value is not None}})
+
+    def ranking(self, metric, limit=5, largest=True):
+        """[(symbol, value)] for the top (or bottom) limit symbols by metric"""
+        with self._lock:
+            side = self._top if largest else self._bottom
+            return side[metric].items(limit)
+
+    def summary(self, limit=5):
+        """Totals plus top gainers and losers (full contracts), in O(k)"""
+        limit = min(limit, self.k)
+        with self._lock:
+            gainers = self._top['price_change'].items(limit)
+            losers = self._bottom['price_change'].items(limit)
+            return {
+                'total_contracts': len(self._contracts),
+                **{name: self._totals[metric] for name, metric in TOTALS.items()},
+                'top_gainers': [self._contracts[symbol] for symbol, _ in gainers],
+                'top_losers': [self._contracts[symbol] for symbol, _ in reversed(losers)]
+            }
+
+    def version(self):
+        """Changes whenever any contract's stats change"""
+        with self._lock:
+            return self.updates
+
+    def stats(self):
+        with self._lock:
+            return {
+                'symbols': len(self._contracts),
+                'k': self.k,
+                'updates': self.updates,
+                'rebuilds': {metric: self._top[metric].rebuilds + self._bottom[metric].rebuilds for metric in METRICS}
+            }
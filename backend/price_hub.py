@@ -0,0 +1,109 @@
+"""
+Fan-out of market state updates to Server-Sent Events clients.
+
+PriceHub listens to a MarketStateStore and formats each update once, then
+hands the same encoded event to every subscribed client's bounded queue.
+A client whose queue is full is dropped as a slow consumer instead of
+buffering without limit, so the cost of an update does not grow with the
+number of viewers beyond one queue put per subscriber.
+"""
+import queue
+import threading
+
+
+class Subscription:
+    """One SSE client: a bounded queue of encoded events for a set of symbols"""
+
+    def __init__(self, symbols, queue_size):
+        self.symbols = frozenset(symbols)
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.dropped = False
+        self.delivered = 0
+
+    def next_event(self, timeout):
+        """Return the next encoded event, or None on timeout"""
+        try:
+            return self.queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+
+class PriceHub:
+    """Shared source of price events for every connected stream client"""
+
+    def __init__(self, store, formatter, queue_size=100, max_clients=500):
+        self._formatter = formatter
+        self._queue_size = queue_size
+        self._max_clients = max_clients
+        self._lock = threading.Lock()
+        self._by_symbol = {}
+        self._clients = 0
+        self._events_published = 0
+        self._events_delivered = 0
+        self._slow_consumers_dropped = 0
+        store.add_listener(self._on_update)
+
+    @staticmethod
+    def encode(event, payload):
+        return f'event: {event}\ndata: {payload}\n\n'
+
+    def subscribe(self, symbols):
+        """Register a client; returns None when the hub is at max_clients"""
+        with self._lock:
+            if self._clients >= self._max_clients:
+                return None
+            subscription = Subscription(symbols, self._queue_size)
+            for symbol in subscription.symbols:
+                self._by_symbol.setdefault(symbol, set()).add(subscription)
+            self._clients += 1
+            return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            removed = False
+            for symbol in subscription.symbols:
+                subscribers = self._by_symbol.get(symbol)
+                if subscribers and subscription in subscribers:
+                    subscribers.discard(subscription)
+                    removed = True
+                    if not subscribers:
+                        del self._by_symbol[symbol]
+            if removed:
+                self._clients -= 1
+
+    def _on_update(self, symbol, state):
+        with self._lock:
+            subscribers = list(self._by_symbol.get(symbol, ()))
+        if not subscribers:
+            return
+
+        # Encode once, deliver the same string to every subscriber
+        event = self.encode('price', self._formatter(symbol, state))
+        delivered = 0
+        slow = []
+        for subscription in subscribers:
+            try:
+                subscription.queue.put_nowait(event)
+                subscription.delivered += 1
+                delivered += 1
+            except queue.Full:
+                slow.append(subscription)
+
+        for subscription in slow:
+            subscription.dropped = True
+            self.unsubscribe(subscription)
+        with self._lock:
+            self._events_published += 1
+            self._events_delivered += delivered
+            self._slow_consumers_dropped += len(slow)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'clients': self._clients,
+                'symbols': len(self._by_symbol),
+                'queue_size': self._queue_size,
+                'events_published': self._events_published,
+                'events_delivered': self._events_delivered,
+                'slow_consumers_dropped': self._slow_consumers_dropped
+            }
@@ -0,0 +1,50 @@
+"""
+Field projection for market-data payloads.
+
+A ?fields=a,b,c parameter is validated and normalized into a sorted tuple of
+field names, and the projector for each distinct tuple is built once and
+cached, so trimming 300 contracts to 3 fields costs about as much as copying
+them.
+"""
+import re
+from functools import lru_cache
+
+MAX_FIELDS = 50
+FIELD_NAME = re.compile(r'^[A-Za-z_][A-Za-z0-9_]{0,63}$')
+
+
+class ProjectionError(ValueError):
+    """Raised for an invalid fields= parameter (reported to the client as a 400)"""
+
+
+def parse_fields(raw, always=('symbol',)):
+    """Turn 'a,b,c' into a normalized tuple of field names, or None for no projection"""
+    if not raw:
+        return None
+    fields = [field.strip() for field in raw.split(',') if field.strip()]
+    if len(fields) > MAX_FIELDS:
+        raise ProjectionError(f'At most {MAX_FIELDS} fields may be requested')
+    invalid = [field for field in fields if not FIELD_NAME.match(field)]
+    if invalid:
+        raise ProjectionError(f'Invalid field name: {invalid[0][:64]!r} (letters, digits and _, at most 64)')
+    # Sorted so a,b and b,a share one compiled projection and one cached body
+    return tuple(sorted(set(fields) | set(always)))
+
+
+@lru_cache(maxsize=256)
+def compile_projection(fields):
+    """Return a function mapping a dict to a dict holding only fields (missing ones as None)"""
+    def project_row(row):
+        get = row.get
+        return {field: get(field) for field in fields}
+    return project_row
+
+
+def project(rows, fields):
+    """Apply a parsed field set to one dict or a list of dicts (None leaves them untouched)"""
+    if fields is None:
+        return rows
+    fn = compile_projection(fields)
+    if isinstance(rows, dict):
+        return fn(rows)
+    return [fn(row) for row in rows]
@@ -0,0 +1,216 @@
+"""
+In-process background job scheduler.
+
+Each Job runs on its own daemon thread so a slow job (e.g. a kline backfill)
+never delays another. The delay before each run comes from a fixed interval
+or a schedule() callback (e.g. "just after the next funding settlement"),
+stretched by a random jitter so processes and restarts don't synchronize
+their upstream calls.
+
+Exclusive jobs take a lease in a shared SQLite table before running, so when
+several worker processes serve the app only one of them runs the job; if it
+dies the lease expires and another process takes over. While a job runs its
+lease is renewed every third of its TTL, so a run that outlasts the TTL (a
+cold kline backfill) is never taken over halfway. Jobs that only warm
+process-local memory are not exclusive: every process needs its own copy.
+"""
+import logging
+import os
+import random
+import secrets
+import socket
+import sqlite3
+import threading
+import time
+
+LEASE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS scheduler_leases (
+    job TEXT PRIMARY KEY,
+    owner TEXT NOT NULL,
+    expires_at REAL NOT NULL
+)
+"""
+
+
+class JobLease:
+    """Cross-process job ownership backed by a SQLite table"""
+
+    def __init__(self, path):
+        self.path = path
+        self.owner = f'{socket.gethostname()}:{os.getpid()}:{secrets.token_hex(4)}'
+        with sqlite3.connect(self.path, timeout=10) as conn:
+            conn.execute(LEASE_SCHEMA)
+
+    def acquire(self, job, ttl):
+        """Take or renew the lease for job; return True if this process holds it"""
+        now = time.time()
+        with sqlite3.connect(self.path, timeout=10) as conn:
+            conn.execute('INSERT OR IGNORE INTO scheduler_leases (job, owner, expires_at) VALUES (?, ?, 0)',
+                         (job, self.owner))
+            updated = conn.execute(
+                'UPDATE scheduler_leases SET owner = ?, expires_at = ? '
+                'WHERE job = ? AND (owner = ? OR expires_at < ?)',
+                (self.owner, now + ttl, job, self.owner, now)
+            ).rowcount
+        return updated == 1
+
+    def release(self, job):
+        with sqlite3.connect(self.path, timeout=10) as conn:
+            conn.execute('DELETE FROM scheduler_leases WHERE job = ? AND owner = ?', (job, self.owner))
+
+
+class Job:
+    """A named background task run every interval seconds, or after schedule() seconds"""
+
+    def __init__(self, name, fn, interval=60.0, schedule=None, jitter=0.1, exclusive=True,
+                 run_at_start=True):
+        self.name = name
+        self.fn = fn
+        self.interval = interval
+        self.schedule = schedule
+        self.jitter = jitter
+        self.exclusive = exclusive
+        self.run_at_start = run_at_start
+        self.wake = threading.Event()
+        self.thread = None
+        self.runs = 0
+        self.failures = 0
+        self.skipped = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+        self.last_seconds = None
+        self.last_run_at = None
+        self.next_run_at = None
+        self.last_error = None
+
+    def next_delay(self):
+        delay = None
+        if self.schedule is not None:
+            try:
+                delay = self.schedule()
+            except Exception as e:
+                self.last_error = f'schedule: {e}'
+        if delay is None:
+            delay = self.interval
+        # Only ever late, never early: a funding job must not run before settlement
+        return max(0.0, delay) * (1 + random.uniform(0, self.jitter))
+
+    @property
+    def lease_ttl(self):
+        return max(30.0, self.interval * 3)
+
+    def stats(self):
+        return {
+            'exclusive': self.exclusive,
+            'interval_seconds': self.interval,
+            'runs': self.runs,
+            'failures': self.failures,
+            'skipped_not_leader': self.skipped,
+            'last_ms': round(self.last_seconds * 1000, 3) if self.last_seconds is not None else None,
+            'avg_ms': round(self.total_seconds / self.runs * 1000, 3) if self.runs else None,
+            'max_ms': round(self.max_seconds * 1000, 3),
+            'last_run_age_seconds': round(time.time() - self.last_run_at, 3) if self.last_run_at else None,
+            'next_run_in_seconds': round(self.next_run_at - time.time(), 3) if self.next_run_at else None,
+            'last_error': self.last_error
+        }
+
+
+class Scheduler:
+    def __init__(self, lease=None, logger=None):
+        self.lease = lease
+        self._logger = logger or logging.getLogger(__name__)
+        self._jobs = {}
+        self._stop = threading.Event()
+
+    def add(self, job):
+        self._jobs[job.name] = job
+        return job
+
+    def run_soon(self, name):
+        """Wake a job now instead of waiting out its delay"""
+        job = self._jobs.get(name)
+        if job is not None:
+            job.wake.set()
+
+    def start(self):
+        self._stop.clear()
+        for job in self._jobs.values():
+            if job.thread and job.thread.is_alive():
+                continue
+            job.thread = threading.Thread(target=self._loop, args=(job,), name=f'scheduler-{job.name}', daemon=True)
+            job.thread.start()
+
+    def stop(self, timeout=5):
+        self._stop.set()
+        for job in self._jobs.values():
+            job.wake.set()
+        for job in self._jobs.values():
+            if job.thread:
+                job.thread.join(timeout)
+            if job.exclusive and self.lease:
+                try:
+                    self.lease.release(job.name)
+                except sqlite3.Error:
+                    pass
+
+    def _loop(self, job):
+        delay = 0.0 if job.run_at_start else job.next_delay()
+        while not self._stop.is_set():
+            job.next_run_at = time.time() + delay
+            job.wake.wait(delay)
+            job.wake.clear()
+            if self._stop.is_set():
+                break
+            self.run_job(job)
+            delay = job.next_delay()
+
+    def run_job(self, job):
+        """Run job once in the calling thread, honouring its lease"""
+        if job.exclusive and self.lease:
+            try:
+                if not self.lease.acquire(job.name, job.lease_ttl):
+                    job.skipped += 1
+                    return False
+            except sqlite3.Error as e:
+                job.failures += 1
+                job.last_error = f'lease: {e}'
+                return False
+        done = threading.Event()
+        renewer = None
+        if job.exclusive and self.lease:
+            renewer = threading.Thread(target=self._renew, args=(job, done), name=f'lease-{job.name}', daemon=True)
+            renewer.start()
+        started = time.perf_counter()
+        try:
+            job.fn()
+        except Exception as e:
+            job.failures += 1
+            job.last_error = str(e)
+            self._logger.warning(f'Scheduled job {job.name} failed: {e}')
+        finally:
+            done.set()
+            if renewer is not None:
+                renewer.join()
+            elapsed = time.perf_counter() - started
+            job.runs += 1
+            job.total_seconds += elapsed
+            job.max_seconds = max(job.max_seconds, elapsed)
+            job.last_seconds = elapsed
+            job.last_run_at = time.time()
+        return True
+
+    def _renew(self, job, done):
+        while not done.wait(job.lease_ttl / 3):
+            try:
+                if not self.lease.acquire(job.name, job.lease_ttl):
+                    self._logger.warning(f'Scheduled job {job.name} lost its lease while running')
+                    return
+            except sqlite3.Error as e:
+                self._logger.warning(f'Could not renew lease for job {job.name}: {e}')
+
+    def stats(self):
+        return {
+            'owner': self.lease.owner if self.lease else None,
+            'running': any(job.thread and job.thread.is_alive() for job in self._jobs.values()),
+            'jobs': {name: job.stats() for name, job in self._jobs.items()}
+        }
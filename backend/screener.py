@@ -0,0 +1,181 @@
+"""
+Server-side contract screener.
+
+ScreenerIndex is rebuilt once per contracts snapshot. It keeps the columnar
+contract table, categorical arrays for status and quote currency, and
+precomputed ascending/descending row orders for every sortable column, so a
+query is a vectorized mask plus a slice of an existing ordering instead of a
+filter-and-sort over every contract dict.
+"""
+import threading
+import time
+
+import numpy as np
+
+from contract_table import COLUMNS, FIELDS
+
+SORT_KEYS = ['symbol'] + list(COLUMNS)
+
+
+class ScreenerError(ValueError):
+    """Raised for an invalid screener query (reported to the client as a 400)"""
+
+
+def sort_key(name):
+    """Accept table column names or raw KuCoin field names (e.g. volumeOf24h)"""
+    name = FIELDS.get(name, name)
+    if name not in SORT_KEYS:
+        raise ScreenerError(f'Unknown sort key: {name}')
+    return name
+
+
+class ScreenerIndex:
+    def __init__(self, table, contracts):
+        by_symbol = {contract.get('symbol'): contract for contract in contracts}
+        self.table = table
+        self.contracts = [by_symbol[symbol] for symbol in table.symbols]
+        self.symbols_lower = np.array([symbol.lower() for symbol in table.symbols], dtype=str)
+        self.status = np.array([contract.get('status') or '' for contract in self.contracts], dtype=object)
+        self.quote = np.array([contract.get('quoteCurrency') or '' for contract in self.contracts], dtype=object)
+        self.built_at = time.time()
+
+        # NaNs sort last in both directions
+        self.orders = {'symbol': (np.argsort(self.symbols_lower, kind='stable'),
+                                  np.argsort(self.symbols_lower, kind='stable')[::-1])}
+        self.symbol_rank = np.empty(len(self.contracts), dtype=np.float64)
+        self.symbol_rank[self.orders['symbol'][0]] = np.arange(len(self.contracts))
+        for column in COLUMNS:
+            values = table[column]
+            self.orders[column] = (np.argsort(values, kind='stable'), np.argsort(-values, kind='stable'))
+
+    def mask(self, statuses=None, quotes=None, search=None, ranges=None):
+        """Boolean row mask for the given filters; ranges maps column -> (min, max)"""
+        mask = np.ones(len(self.contracts), dtype=bool)
+        if statuses:
+            mask &= np.isin(self.status, statuses)
+        if quotes:
+            mask &= np.isin(self.quote, quotes)
+        if search:
+            mask &= np.char.find(self.symbols_lower, search.lower()) >= 0
+        for column, (low, high) in (ranges or {}).items():
+            values = self.table[column]
+            if low is not None:
+                mask &= values >= low
+            if high is not None:
+                mask &= values <= high
+        return mask
+
+    def query(self, mask, sort=(('symbol', False),), offset=0, limit=50):
+        """Return (total_matches, [contracts]) for one page of the masked rows in sort order"""
+        total = int(mask.sum())
+        if len(sort) == 1:
+            column, descending = sort[0]
+            order = self.orders[column][1 if descending else 0]
+            rows = order[mask[order]]
+        else:
+            rows = np.flatnonzero(mask)
+            keys = []
+            # lexsort treats the last key as primary
+            for column, descending in reversed(sort):
+                if column == 'symbol':
+                    values = self.symbol_rank[rows]
+                else:
+                    values = self.table[column][rows]
+                values = -values if descending else values
+                keys.append(np.where(np.isnan(values), np.inf, values))
+            rows = rows[np.lexsort(keys)] if keys else rows
+        page = rows[offset:offset + limit]
+        return total, [self.contracts[row] for row in page]
+
+
+class Screener:
+    """Holds the current ScreenerIndex and parses request arguments into queries"""
+
+    def __init__(self, max_limit=500):
+        self.max_limit = max_limit
+        self._lock = threading.Lock()
+        self._index = None
+        self._builds = 0
+        self._queries = 0
+        self._build_seconds = 0.0
+
+    def rebuild(self, table, contracts):
+        started = time.perf_counter()
+        index = ScreenerIndex(table, contracts)
+        with self._lock:
+            self._index = index
+            self._builds += 1
+            self._build_seconds = time.perf_counter() - started
+
+    def index(self):
+        with self._lock:
+            return self._index
+
+    def parse(self, args):
+        """Turn request args into keyword arguments for ScreenerIndex.mask/query"""
+        def csv(name):
+            return [value for value in args.get(name, '').split(',') if value]
+
+        def number(name):
+            raw = args.get(name)
+            if raw in (None, ''):
+                return None
+            try:
+                return float(raw)
+            except ValueError:
+                raise ScreenerError(f'{name} must be a number')
+
+        ranges = {}
+        for column in COLUMNS:
+            low, high = number(f'min_{column}'), number(f'max_{column}')
+            if low is not None or high is not None:
+                ranges[column] = (low, high)
+
+        sort = []
+        for key in csv('sort') or ['symbol']:
+            descending = key.startswith('-')
+            sort.append((sort_key(key.lstrip('-')), descending))
+        if args.get('order') == 'desc' and len(sort) == 1:
+            sort = [(sort[0][0], True)]
+
+        try:
+            offset = max(0, int(args.get('offset', 0)))
+            limit = min(self.max_limit, max(0, int(args.get('limit', 50))))
+        except ValueError:
+            raise ScreenerError('offset and limit must be integers')
+
+        return {
+            'statuses': csv('status'),
+            'quotes': csv('quote'),
+            'search': args.get('q', '').strip(),
+            'ranges': ranges
+        }, {'sort': tuple(sort), 'offset': offset, 'limit': limit}
+
+    def search(self, args):
+        """Run a screener query from request args against the current index"""
+        index = self.index()
+        if index is None:
+            return None
+        filters, paging = self.parse(args)
+        total, contracts = index.query(index.mask(**filters), **paging)
+        with self._lock:
+            self._queries += 1
+        return {
+            'contracts': contracts,
+            'count': len(contracts),
+            'total': total,
+            'universe': len(index.contracts),
+            'offset': paging['offset'],
+            'limit': paging['limit'],
+            'sort': [f'-{column}' if descending else column for column, descending in paging['sort']]
+        }
+
+    def stats(self):
+        with self._lock:
+            return {
+                'rows': len(self._index.contracts) if self._index else 0,
+                'builds': self._builds,
+                'queries': self._queries,
+                'last_build_ms': round(self._build_seconds * 1000, 3),
+                'age_seconds': round(time.time() - self._index.built_at, 3) if self._index else None
+            }
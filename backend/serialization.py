@@ -0,0 +1,169 @@
+"""
+Response serialization for market-data routes.
+
+render() encodes a payload with the fastest JSON backend available (orjson,
+falling back to the stdlib encoder) or as MessagePack when the client asks
+for it via Accept, then compresses bodies above a size threshold with brotli
+or gzip per Accept-Encoding. orjson, msgpack and brotli are optional: a
+missing one only removes that option.
+
+Payloads that are shared by every client (e.g. the contracts snapshot) can
+be rendered with a cache_key so each encoding is produced once per version.
+Per-endpoint byte and timing counters feed /api/kucoin/metrics.
+"""
+import gzip
+import json
+import threading
+import time
+from collections import OrderedDict
+
+from flask import Response, request
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+JSON = 'application/json'
+MSGPACK = 'application/msgpack'
+MSGPACK_TYPES = (MSGPACK, 'application/x-msgpack')
+
+
+def dumps_json(payload):
+    if orjson is not None:
+        return orjson.dumps(payload, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS)
+    return json.dumps(payload, separators=(',', ':'), default=str).encode('utf-8')
+
+
+def dumps_msgpack(payload):
+    return msgpack.packb(payload, use_bin_type=True, default=str)
+
+
+def compress(body, encoding, level=None):
+    if encoding == 'br':
+        return brotli.compress(body, quality=level or 4)
+    return gzip.compress(body, compresslevel=level or 5)
+
+
+class Serializer:
+    """Content-negotiated encoding and compression with per-endpoint metrics"""
+
+    def __init__(self, compress_min_bytes=1024, cache_size=32):
+        self.compress_min_bytes = compress_min_bytes
+        self.cache_size = cache_size
+        self._lock = threading.Lock()
+        self._cache = OrderedDict()
+        self._cache_hits = 0
+        self._by_endpoint = {}
+
+    @staticmethod
+    def negotiate_format(accept):
+        if msgpack is None:
+            return JSON
+        # JSON is listed first so wildcards (*/*) keep getting JSON
+        best = accept.best_match([JSON, *MSGPACK_TYPES], default=JSON)
+        return MSGPACK if best in MSGPACK_TYPES else JSON
+
+    @staticmethod
+    def negotiate_encoding(accept_encoding):
+        if brotli is not None and accept_encoding['br']:
+            return 'br'
+        if accept_encoding['gzip']:
+            return 'gzip'
+        return None
+
+    def variant(self):
+        """Short tag for the representation render() would produce for this request (for ETags)"""
+        mimetype = self.negotiate_format(request.accept_mimetypes)
+        encoding = self.negotiate_encoding(request.accept_encodings)
+        tag = 'msgpack' if mimetype == MSGPACK else 'json'
+        return f'{tag}.{encoding}' if encoding else tag
+
+    def encode(self, payload, mimetype, encoding):
+        """Return (body, content_encoding, raw_bytes, encode_seconds, compress_seconds)"""
+        started = time.perf_counter()
+        body = dumps_msgpack(payload) if mimetype == MSGPACK else dumps_json(payload)
+        encoded = time.perf_counter()
+        raw_bytes = len(body)
+        content_encoding = None
+        if encoding and raw_bytes >= self.compress_min_bytes:
+            body = compress(body, encoding)
+            content_encoding = encoding
+        return body, content_encoding, raw_bytes, encoded - started, time.perf_counter() - encoded
+
+    def render(self, payload, status=200, cache_key=None):
+        """Build a Response for payload (or a zero-argument callable producing it)"""
+        mimetype = self.negotiate_format(request.accept_mimetypes)
+        encoding = self.negotiate_encoding(request.accept_encodings)
+        key = (cache_key, mimetype, encoding) if cache_key else None
+
+        with self._lock:
+            cached = self._cache.get(key) if key else None
+            if cached is not None:
+                self._cache.move_to_end(key)
+                self._cache_hits += 1
+        if cached is None:
+            data = payload() if callable(payload) else payload
+            cached = self.encode(data, mimetype, encoding)
+            if key:
+                with self._lock:
+                    self._cache[key] = cached
+                    while len(self._cache) > self.cache_size:
+                        self._cache.popitem(last=False)
+            self._record(cached, len(cached[0]))
+        else:
+            self._record(None, len(cached[0]))
+
+        body, content_encoding = cached[0], cached[1]
+        response = Response(body, status=status, mimetype=mimetype)
+        if content_encoding:
+            response.headers['Content-Encoding'] = content_encoding
+        response.vary.update(('Accept', 'Accept-Encoding'))
+        return response
+
+    def _record(self, encoded, sent_bytes):
+        endpoint = request.endpoint or 'unknown'
+        with self._lock:
+            counts = self._by_endpoint.setdefault(endpoint, {
+                'responses': 0, 'encoded': 0, 'raw_bytes': 0, 'sent_bytes': 0,
+                'encode_ms': 0.0, 'compress_ms': 0.0
+            })
+            counts['responses'] += 1
+            counts['sent_bytes'] += sent_bytes
+            if encoded is not None:
+                counts['encoded'] += 1
+                counts['raw_bytes'] += encoded[2]
+                counts['encode_ms'] += encoded[3] * 1000
+                counts['compress_ms'] += encoded[4] * 1000
+
+    def stats(self):
+        with self._lock:
+            by_endpoint = {}
+            for endpoint, counts in self._by_endpoint.items():
+                encoded = counts['encoded'] or 1
+                by_endpoint[endpoint] = dict(
+                    counts,
+                    encode_ms=round(counts['encode_ms'], 3),
+                    compress_ms=round(counts['compress_ms'], 3),
+                    avg_encode_ms=round(counts['encode_ms'] / encoded, 3),
+                    avg_sent_bytes=round(counts['sent_bytes'] / counts['responses'])
+                )
+            return {
+                'json_backend': 'orjson' if orjson is not None else 'json',
+                'msgpack': msgpack is not None,
+                'brotli': brotli is not None,
+                'compress_min_bytes': self.compress_min_bytes,
+                'cache_entries': len(self._cache),
+                'cache_hits': self._cache_hits,
+                'by_endpoint': by_endpoint
+            }
@@ -0,0 +1,74 @@
+"""
+Single-flight request coalescing.
+
+When several threads ask for the same upstream resource at the same time,
+only the first (the leader) performs the call; the others wait for it and
+share its result or exception. This stops a cold or expired cache from
+turning into a thundering herd of identical KuCoin requests.
+
+Keys can embed request data (symbols, time ranges), so per-key counters would
+grow without bound; counters are kept per caller-supplied group instead
+(e.g. the KuCoin endpoint name).
+"""
+import threading
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """Deduplicate concurrent calls that share a key"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self._executed = 0
+        self._coalesced = 0
+        self._by_group = {}
+
+    def do(self, key, fn, group=None):
+        """Run fn() once for all concurrent callers with the same key and return its result"""
+        with self._lock:
+            call = self._calls.get(key)
+            counts = self._by_group.setdefault(group or 'default', {'executed': 0, 'coalesced': 0})
+            if call is not None:
+                call.waiters += 1
+                self._coalesced += 1
+                counts['coalesced'] += 1
+                leader = False
+            else:
+                call = self._calls[key] = _Call()
+                self._executed += 1
+                counts['executed'] += 1
+                leader = True
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result
+
+    def stats(self):
+        with self._lock:
+            return {
+                'executed': self._executed,
+                'coalesced': self._coalesced,
+                'in_flight': len(self._calls),
+                'by_group': {group: dict(counts) for group, counts in self._by_group.items()}
+            }
@@ -0,0 +1,89 @@
+import threading
+import time
+
+from audit_writer import AuditWriter
+
+
+def recording_writer(**kwargs):
+    batches = []
+    writer = AuditWriter(lambda events: batches.append(list(events)), **kwargs)
+    return writer, batches
+
+
+def test_batches_by_size():
+    writer, batches = recording_writer(batch_size=3, flush_interval=5.0)
+    for i in range(6):
+        writer.submit({'n': i})
+    assert writer.flush()
+    assert [len(batch) for batch in batches] == [3, 3]
+    writer.stop()
+
+
+def test_batches_by_time():
+    writer, batches = recording_writer(batch_size=100, flush_interval=0.05)
+    writer.submit({'n': 1})
+    writer.submit({'n': 2})
+    started = time.monotonic()
+    assert writer.flush()
+    assert batches == [[{'n': 1}, {'n': 2}]]
+    assert time.monotonic() - started < 1.0
+    writer.stop()
+
+
+def blocked_writer():
+    """A writer stuck on its first event, with room for two more in the queue"""
+    writing, release = threading.Event(), threading.Event()
+    batches = []
+
+    def write_batch(events):
+        if not writing.is_set():
+            writing.set()
+            release.wait(5)
+        batches.append(list(events))
+
+    writer = AuditWriter(write_batch, batch_size=1, flush_interval=0.01, max_queue=2)
+    writer.submit({'n': 0})
+    assert writing.wait(5)
+    assert writer.submit({'n': 1}) and writer.submit({'n': 2})
+    return writer, release, batches
+
+
+def test_drops_routine_events_when_full():
+    writer, release, batches = blocked_writer()
+    assert not writer.submit({'n': 3})
+    assert not writer.submit({'n': 4})
+    release.set()
+    writer.stop()
+    stats = writer.stats()
+    assert stats['dropped'] == 2 and stats['written'] == 3
+    assert [event['n'] for batch in batches for event in batch] == [0, 1, 2]
+
+
+def test_critical_events_are_written_inline_when_full():
+    writer, release, batches = blocked_writer()
+    # Written in this thread while the writer thread is still blocked
+    assert writer.submit({'n': 'denied'}, critical=True)
+    assert batches == [[{'n': 'denied'}]]
+    release.set()
+    writer.stop()
+    stats = writer.stats()
+    assert stats['dropped'] == 0 and stats['written_inline'] == 1
+
+
+def test_stop_drains_queue():
+    writer, batches = recording_writer(batch_size=2, flush_interval=5.0)
+    for i in range(5):
+        writer.submit({'n': i})
+    writer.stop()
+    assert not writer.stats()['running']
+    assert sorted(event['n'] for batch in batches for event in batch) == [0, 1, 2, 3, 4]
+
+
+def test_max_lag_covers_time_spent_queued():
+    writer, release, batches = blocked_writer()
+    time.sleep(0.1)
+    release.set()
+    writer.stop()
+    # Events 1 and 2 waited behind the blocked first batch
+    assert writer.max_lag() >= 0.1
+    assert writer.stats()['max_lag_seconds'] >= 0.1
@@ -0,0 +1,44 @@
+import os
+
+from credential_vault import CredentialVault, Credentials
+
+
+def make_vault(store, **kwargs):
+    return CredentialVault(lambda owner, service: store.get((owner, service)), **kwargs)
+
+
+def test_derived_object_is_built_once_per_entry():
+    store = {(1, 'KuCoin'): Credentials('k', 's', 'p')}
+    vault = make_vault(store)
+    built = []
+
+    def build(credentials):
+        built.append(credentials)
+        return object()
+
+    first = vault.get_derived(1, 'KuCoin', build)
+    assert vault.get_derived(1, 'KuCoin', build) is first
+    assert len(built) == 1
+    assert vault.get_derived(2, 'KuCoin', build) is None
+
+
+def test_invalidate_drops_derived_object():
+    store = {(1, 'KuCoin'): Credentials('k', 'old', 'p')}
+    vault = make_vault(store)
+    old = vault.get_derived(1, 'KuCoin', lambda credentials: credentials.secret)
+    store[(1, 'KuCoin')] = Credentials('k', 'new', 'p')
+    vault.invalidate(1, 'KuCoin')
+    assert old == 'old'
+    assert vault.get_derived(1, 'KuCoin', lambda credentials: credentials.secret) == 'new'
+
+
+def test_stamp_from_another_process_drops_derived_object(tmp_path):
+    stamp = str(tmp_path / 'stamp')
+    store = {(1, 'KuCoin'): Credentials('k', 'old', 'p')}
+    vault, other = make_vault(store, stamp_path=stamp), make_vault(store, stamp_path=stamp)
+    vault.get_derived(1, 'KuCoin', lambda credentials: credentials.secret)
+    store[(1, 'KuCoin')] = Credentials('k', 'new', 'p')
+    other.invalidate()
+    # Stamp resolution can be coarse; make sure the mtime visibly moved
+    os.utime(stamp, ns=(0, 0))
+    assert vault.get_derived(1, 'KuCoin', lambda credentials: credentials.secret) == 'new'
@@ -0,0 +1,42 @@
+import sqlite3
+
+from kline_store import MINUTE_MS, KlineIngestor, KlineStore
+
+
+def candles_for(symbol, start, end):
+    return [(ts, 1.0, 2.0, 0.5, 1.5, 10.0, 15.0) for ts in range(start - start % MINUTE_MS, end + 1, MINUTE_MS)]
+
+
+def test_tracked_set_is_shared_between_processes(tmp_path):
+    path = str(tmp_path / 'klines.db')
+    fetched = []
+
+    def fetch(symbol, start, end):
+        fetched.append(symbol)
+        return candles_for(symbol, start, end)
+
+    leader = KlineIngestor(KlineStore(path), fetch, backfill_hours=1)
+    follower = KlineIngestor(KlineStore(path), fetch, backfill_hours=1)
+    assert follower.track('XBTUSDTM')
+    assert not follower.track('XBTUSDTM')
+    assert not leader.track('XBTUSDTM')
+    # Only the leader runs the job, yet it ingests what the follower added
+    leader.run_once()
+    assert set(fetched) == {'XBTUSDTM'}
+    assert follower.store.latest_ts('XBTUSDTM') is not None
+
+
+def test_tracked_set_survives_restart(tmp_path):
+    path = str(tmp_path / 'klines.db')
+    KlineIngestor(KlineStore(path), candles_for, symbols=['ETHUSDTM']).track('XBTUSDTM')
+    restarted = KlineIngestor(KlineStore(path), candles_for)
+    assert restarted.is_tracked('XBTUSDTM') and restarted.is_tracked('ETHUSDTM')
+    assert restarted.stats()['tracked_symbols'] == ['ETHUSDTM', 'XBTUSDTM']
+
+
+def test_existing_store_seeds_tracked_set(tmp_path):
+    path = str(tmp_path / 'klines.db')
+    KlineStore(path).write('SOLUSDTM', candles_for('SOLUSDTM', 0, MINUTE_MS))
+    with sqlite3.connect(path) as conn:
+        conn.execute('DROP TABLE kline_symbols')
+    assert KlineStore(path).tracked() == ['SOLUSDTM']
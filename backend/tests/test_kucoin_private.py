@@ -0,0 +1,21 @@
+import pytest
+
+from kucoin_private import IncompleteCredentials, KucoinSigner
+
+
+@pytest.mark.parametrize('secret, passphrase, missing', [
+    (None, 'p', ['secret']),
+    ('s', None, ['passphrase']),
+    ('', '', ['secret', 'passphrase']),
+])
+def test_signer_names_missing_parts(secret, passphrase, missing):
+    with pytest.raises(IncompleteCredentials) as raised:
+        KucoinSigner('k', secret, passphrase)
+    assert raised.value.missing == missing
+
+
+def test_signer_headers():
+    headers = KucoinSigner('k', 's', 'p').headers(1700000000000, 'get', '/api/v1/positions')
+    assert headers['KC-API-KEY'] == 'k'
+    assert headers['KC-API-TIMESTAMP'] == '1700000000000'
+    assert headers['KC-API-PASSPHRASE'] != 'p' and headers['KC-API-KEY-VERSION'] == '2'
@@ -0,0 +1,66 @@
+import time
+
+import pytest
+
+from kucoin_ratelimit import (BACKGROUND, INTERACTIVE, KucoinRateLimiter, RateLimitExceeded, TokenBucket,
+                              parse_retry_after)
+
+
+def test_bucket_spends_capacity_then_rejects():
+    bucket = TokenBucket('public', rate=0.001, capacity=3)
+    for _ in range(3):
+        bucket.acquire(INTERACTIVE, timeout=0)
+    with pytest.raises(RateLimitExceeded):
+        bucket.acquire(INTERACTIVE, timeout=0)
+    assert bucket.stats()['acquired'][INTERACTIVE] == 3
+    assert bucket.stats()['rejected'][INTERACTIVE] == 1
+
+
+def test_background_stops_at_reserve():
+    bucket = TokenBucket('public', rate=0.001, capacity=10, reserve_fraction=0.5)
+    for _ in range(5):
+        bucket.acquire(BACKGROUND, timeout=0)
+    with pytest.raises(RateLimitExceeded):
+        bucket.acquire(BACKGROUND, timeout=0)
+    # The reserve is still there for user-facing requests
+    bucket.acquire(INTERACTIVE, timeout=0)
+
+
+def test_refill_lets_waiting_caller_through():
+    bucket = TokenBucket('public', rate=50, capacity=1)
+    bucket.acquire(timeout=0)
+    started = time.monotonic()
+    bucket.acquire(timeout=1)
+    assert 0.005 < time.monotonic() - started < 0.5
+
+
+def test_upstream_headers_cap_tokens_and_block_at_zero():
+    bucket = TokenBucket('public', rate=100, capacity=10)
+    bucket.observe({'gw-ratelimit-limit': '10', 'gw-ratelimit-remaining': '0', 'gw-ratelimit-reset': '5000'})
+    with pytest.raises(RateLimitExceeded) as raised:
+        bucket.acquire(timeout=0.1)
+    assert raised.value.retry_after > 4
+
+
+def test_throttle_backs_off_exponentially_and_success_resets():
+    bucket = TokenBucket('public', rate=100, capacity=10)
+    first = bucket.throttle()
+    second = bucket.throttle()
+    assert 0.5 <= first <= 0.75 and 1.0 <= second <= 1.5
+    bucket.success()
+    assert bucket.throttle(retry_after=2) >= 2
+
+
+def test_limiter_routes_endpoints_to_groups():
+    limiter = KucoinRateLimiter({'public': (1, 5), 'private': (1, 1)}, {'private': 'private'})
+    limiter.acquire('private', timeout=0)
+    with pytest.raises(RateLimitExceeded):
+        limiter.acquire('private', timeout=0)
+    limiter.acquire('contracts_active', timeout=0)
+    assert limiter.stats()['public']['acquired'][INTERACTIVE] == 1
+
+
+def test_parse_retry_after():
+    assert parse_retry_after({'Retry-After': '3'}) == 3.0
+    assert parse_retry_after({'gw-ratelimit-reset': '1500'}) == 1.5
+    assert parse_retry_after({}) is None
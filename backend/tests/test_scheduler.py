@@ -0,0 +1,54 @@
+import time
+
+from scheduler import Job, JobLease, Scheduler
+
+
+class ShortLeaseJob(Job):
+    lease_ttl = 0.3
+
+
+def test_lease_is_exclusive_until_released(tmp_path):
+    path = str(tmp_path / 'leases.db')
+    first, second = JobLease(path), JobLease(path)
+    assert first.acquire('klines', 60)
+    assert first.acquire('klines', 60)
+    assert not second.acquire('klines', 60)
+    first.release('klines')
+    assert second.acquire('klines', 60)
+
+
+def test_expired_lease_is_taken_over(tmp_path):
+    path = str(tmp_path / 'leases.db')
+    first, second = JobLease(path), JobLease(path)
+    assert first.acquire('klines', 0.05)
+    time.sleep(0.1)
+    assert second.acquire('klines', 60)
+    assert not first.acquire('klines', 60)
+
+
+def test_lease_is_renewed_while_job_runs(tmp_path):
+    path = str(tmp_path / 'leases.db')
+    other = JobLease(path)
+    taken = []
+
+    def long_backfill():
+        # Several TTLs long; without renewal the other process would win halfway
+        for _ in range(5):
+            time.sleep(0.2)
+            taken.append(other.acquire('klines', 60))
+
+    scheduler = Scheduler(lease=JobLease(path))
+    job = scheduler.add(ShortLeaseJob('klines', long_backfill))
+    assert scheduler.run_job(job)
+    assert taken == [False] * 5
+    assert job.failures == 0 and job.runs == 1
+
+
+def test_non_leader_skips_job(tmp_path):
+    path = str(tmp_path / 'leases.db')
+    assert JobLease(path).acquire('funding', 60)
+    calls = []
+    scheduler = Scheduler(lease=JobLease(path))
+    job = scheduler.add(Job('funding', lambda: calls.append(1)))
+    assert not scheduler.run_job(job)
+    assert calls == [] and job.skipped == 1
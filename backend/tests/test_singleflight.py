@@ -0,0 +1,51 @@
+import threading
+import time
+
+import pytest
+
+from singleflight import SingleFlight
+
+
+def test_concurrent_callers_share_one_call():
+    flight = SingleFlight()
+    calls = []
+    release = threading.Event()
+
+    def slow():
+        calls.append(1)
+        release.wait(2)
+        return 'value'
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(flight.do('k', slow, group='g'))) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.1)
+    release.set()
+    for thread in threads:
+        thread.join(2)
+
+    assert results == ['value'] * 5
+    assert len(calls) == 1
+    stats = flight.stats()
+    assert stats['executed'] == 1 and stats['coalesced'] == 4
+    assert stats['by_group'] == {'g': {'executed': 1, 'coalesced': 4}}
+    assert stats['in_flight'] == 0
+
+
+def test_error_is_shared_and_key_is_released():
+    flight = SingleFlight()
+
+    def fail():
+        raise ValueError('boom')
+
+    with pytest.raises(ValueError):
+        flight.do('k', fail)
+    assert flight.do('k', lambda: 2) == 2
+
+
+def test_counters_do_not_grow_per_key():
+    flight = SingleFlight()
+    for start in range(100):
+        flight.do(f'GET /klines?from={start}', lambda: None, group='kline')
+    assert flight.stats()['by_group'] == {'kline': {'executed': 100, 'coalesced': 0}}
@@ -1,4 +1,4 @@
-import React, { useState, useEffect } from 'react';
+import React, { useState, useEffect, useRef } from 'react';
 import axios from 'axios';
 
 const KucoinPrice = ({ symbol = 'XBTUSDTM' }) => {
@@ -7,28 +7,82 @@ const KucoinPrice = ({ symbol = 'XBTUSDTM' }) => {
   const [error, setError] = useState(null);
   const [loading, setLoading] = useState(true);
 
+  // Last shown price, read by the handlers below without nesting state updates
+  const priceRef = useRef(null);
+
   useEffect(() => {
+    const showPrice = (next) => {
+      setPreviousPrice(priceRef.current);
+      priceRef.current = next;
+      setPrice(next);
+    };
+
     const fetchPrice = async () => {
       try {
         setLoading(true);
         const response = await axios.get(`http://localhost:5001/api/kucoin/price/${symbol}`, {
+          params: { raw: 0 },
           withCredentials: true
         });
-        setPreviousPrice(price);
-        setPrice(response.data.price);
+        showPrice(response.data.price);
         setError(null);
       } catch (err) {
         setError(err.response?.data?.error || 'Failed to fetch price');
+        priceRef.current = null;
         setPrice(null);
       } finally {
         setLoading(false);
       }
     };
 
-    fetchPrice();
-    const interval = setInterval(fetchPrice, 5000); // Update every 5 seconds
+    let interval = null;
+    const startPolling = () => {
+      if (interval) return;
+      fetchPrice();
+      interval = setInterval(fetchPrice, 5000); // Update every 5 seconds
+    };
 
-    return () => clearInterval(interval);
+    // Prefer the shared server-sent price stream, fall back to polling
+    const MAX_STREAM_FAILURES = 3;
+    let source = null;
+    let failures = 0;
+    let stopped = false;
+    const connect = () => {
+      source = new EventSource(`http://localhost:5001/api/kucoin/stream?symbols=${symbol}`, {
+        withCredentials: true
+      });
+      source.addEventListener('price', (event) => {
+        const data = JSON.parse(event.data);
+        failures = 0;
+        showPrice(data.price);
+        setError(null);
+        setLoading(false);
+      });
+      // The server dropped us for falling behind; a fresh connection starts from a new snapshot
+      source.addEventListener('dropped', () => {
+        source.close();
+        if (!stopped) connect();
+      });
+      source.onerror = () => {
+        // The browser reconnects on its own unless the server refused the stream
+        failures += 1;
+        if (source.readyState === EventSource.CLOSED || failures >= MAX_STREAM_FAILURES) {
+          source.close();
+          startPolling();
+        }
+      };
+    };
+    if (typeof EventSource !== 'undefined') {
+      connect();
+    } else {
+      startPolling();
+    }
+
+    return () => {
+      stopped = true;
+      if (source) source.close();
+      if (interval) clearInterval(interval);
+    };
   }, [symbol]);
 
   const getPriceChange = () => {
@@ -16,6 +16,7 @@ const Symbols = () => {
   const [filterStatus, setFilterStatus] = useState('all');
   const [showAdvanced, setShowAdvanced] = useState(false);
   const [refreshing, setRefreshing] = useState(false);
+  const [screenerTotal, setScreenerTotal] = useState(null);
 
   const api = axios.create({
     baseURL: 'http://localhost:5001/api',
@@ -23,11 +24,16 @@ const Symbols = () => {
   });
 
   useEffect(() => {
-    loadSymbols();
     loadMySymbols();
     loadMarketStats();
   }, []);
 
+  // Search, sort and status filtering run server-side; debounce keystrokes
+  useEffect(() => {
+    const timeout = setTimeout(loadSymbols, 250);
+    return () => clearTimeout(timeout);
+  }, [searchTerm, sortBy, sortOrder, filterStatus]);
+
   useEffect(() => {
     if (mySymbols.length > 0) {
       fetchSymbolPrices();
@@ -38,11 +44,22 @@ const Symbols = () => {
 
   const loadSymbols = async () => {
     try {
-      setLoading(true);
-      const response = await api.get('/kucoin/contracts');
+      // Only the first load blocks the page; refilters keep the search box mounted
+      if (kucoinSymbols.length === 0) setLoading(true);
+      const response = await api.get('/kucoin/screener', {
+        params: {
+          q: searchTerm || undefined,
+          status: filterStatus === 'all' ? undefined : filterStatus,
+          sort: sortOrder === 'desc' ? `-${sortBy}` : sortBy,
+          fields: 'status,volumeOf24h,priceChgPct,openInterest,maxLeverage,isInverse',
+          limit: 500
+        }
+      });
       if (response.data.contracts) {
         setKucoinSymbols(response.data.contracts);
+        setScreenerTotal(response.data.universe);
       } else {
+        setScreenerTotal(null);
         // Fallback to predefined list if API fails
         const commonFuturesSymbols = [
           'XBTUSDTM', 'ETHUSDTM', 'SOLUSDTM', 'BNBUSDTM', 'ADAUSDTM',
@@ -90,13 +107,22 @@ const Symbols = () => {
 
   const fetchSymbolPrices = async () => {
     try {
+      let fetched = {};
+      try {
+        // One batched request for the whole watchlist
+        const response = await api.get('/kucoin/prices', {
+          params: { symbols: mySymbols.join(','), raw: 0 }
+        });
+        fetched = response.data.prices || {};
+      } catch (error) {
+        console.error('Error fetching watchlist prices:', error);
+      }
+
       const prices = {};
       for (const symbol of mySymbols) {
-        try {
-          const response = await api.get(`/kucoin/price/${symbol}`);
-          prices[symbol] = response.data;
-        } catch (error) {
-          console.error(`Error fetching price for ${symbol}:`, error);
+        if (fetched[symbol]) {
+          prices[symbol] = fetched[symbol];
+        } else {
           // Use mock data for demo
           prices[symbol] = {
             price: (Math.random() * 50000 + 1000).toFixed(2),
@@ -201,6 +227,11 @@ const Symbols = () => {
   };
 
   const getFilteredAndSortedSymbols = () => {
+    // Screener results arrive filtered and sorted already
+    if (screenerTotal !== null) {
+      return kucoinSymbols;
+    }
+
     let filtered = kucoinSymbols.filter(symbol => {
       const symbolStr = typeof symbol === 'string' ? symbol : symbol.symbol;
       const status = typeof symbol === 'string' ? 'Open' : symbol.status;
@@ -709,7 +740,7 @@ const Symbols = () => {
               <div className="bg-white/5 backdrop-blur-xl rounded-xl border border-white/10 overflow-hidden">
                 <div className="p-6 border-b border-white/10">
                   <h3 className="text-xl font-semibold text-white">Available KuCoin Futures Symbols</h3>
-                  <p className="text-gray-400 text-sm mt-1">Showing {getFilteredAndSortedSymbols().length} of {kucoinSymbols.length} symbols</p>
+                  <p className="text-gray-400 text-sm mt-1">Showing {getFilteredAndSortedSymbols().length} of {screenerTotal ?? kucoinSymbols.length} symbols</p>
                 </div>
                 
                 <div className="p-6">
@@ -1,5 +1,4 @@
 import axios from 'axios';
-import CryptoJS from 'crypto-js';
 import { apiStorage } from './apiStorage';
 
 class APIService {
@@ -12,25 +11,13 @@ class APIService {
     });
   }
 
-  // KuCoin API calls
-  async kucoinRequest(endpoint, method = 'GET', params = {}) {
-    const apiKey = await apiStorage.getAPIKey('kucoin');
-    if (!apiKey) throw new Error('KuCoin API key not found');
-
-    const timestamp = Date.now();
-    const signature = this.generateKucoinSignature(endpoint, method, timestamp, apiKey.secret);
-
+  // KuCoin private calls go through the backend, which signs them with the stored key
+  async kucoinRequest(endpoint, params = {}) {
     return this.axios({
-      method,
-      url: `https://api.kucoin.com${endpoint}`,
-      headers: {
-        'KC-API-KEY': apiKey.key,
-        'KC-API-SIGN': signature,
-        'KC-API-TIMESTAMP': timestamp,
-        'KC-API-PASSPHRASE': apiKey.passphrase
-      },
-      data: method !== 'GET' ? params : undefined,
-      params: method === 'GET' ? params : undefined
+      method: 'GET',
+      url: `http://localhost:5001/api/kucoin${endpoint}`,
+      params,
+      withCredentials: true
     });
   }
 
@@ -50,15 +37,13 @@ class APIService {
     });
   }
 
-  // Generate KuCoin signature
-  generateKucoinSignature(endpoint, method, timestamp, secret) {
-    const str = `${timestamp}${method}${endpoint}`;
-    return CryptoJS.HmacSHA256(str, secret).toString(CryptoJS.enc.Base64);
+  // Example API methods
+  async getKucoinBalance(currency = 'USDT') {
+    return this.kucoinRequest('/account-overview', { currency });
   }
 
-  // Example API methods
-  async getKucoinBalance() {
-    return this.kucoinRequest('/api/v1/accounts');
+  async getKucoinPositions() {
+    return this.kucoinRequest('/positions');
   }
 
   async getCryptometerData(symbol) {